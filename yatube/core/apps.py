@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+PROFILING_MIDDLEWARE = 'core.profiling.ProfilingMiddleware'
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        if PROFILING_MIDDLEWARE in settings.MIDDLEWARE:
+            from .profiling import install
+            install()
+        if settings.TEMPLATE_WARMUP:
+            from .template_warmup import warm_up
+            warm_up()
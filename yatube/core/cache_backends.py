@@ -0,0 +1,280 @@
+import pickle
+import socket
+import threading
+import time
+from collections import Counter, OrderedDict
+from urllib.parse import urlparse
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """Одно соединение по протоколу RESP с Redis-совместимым сервером."""
+
+    def __init__(self, host, port, db=0, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if db:
+            self.call('SELECT', db)
+
+    def call(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(parts))
+        return self.read_reply()
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Сервер кэша закрыл соединение')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RedisError(f'Неизвестный ответ сервера: {line!r}')
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class RedisCache(BaseCache):
+    """
+    Кэш на Redis или любом сервере, говорящем на протоколе RESP.
+
+    LOCATION задаётся как redis://host:port/db. Значения хранятся в
+    pickle, у каждого потока своё постоянное соединение.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        url = urlparse(server)
+        self._host = url.hostname or '127.0.0.1'
+        self._port = url.port or 6379
+        self._db = int(url.path.strip('/') or 0)
+        self._socket_timeout = params.get('OPTIONS', {}).get(
+            'SOCKET_TIMEOUT', 1)
+        self._local = threading.local()
+
+    def _call(self, *args):
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = RedisConnection(
+                    self._host, self._port, self._db, self._socket_timeout)
+                self._local.connection = connection
+            try:
+                return connection.call(*args)
+            except (ConnectionError, socket.timeout):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+    def _ttl_ms(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return int(timeout * 1000)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _set(self, key, value, timeout, *flags):
+        ttl = self._ttl_ms(timeout)
+        if ttl is not None and ttl <= 0:
+            self._call('DEL', key)
+            return False
+        args = ['SET', key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)]
+        if ttl is not None:
+            args += ['PX', ttl]
+        return self._call(*args, *flags) == 'OK'
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._key(key, version), value, timeout, 'NX')
+
+    def get(self, key, default=None, version=None):
+        value = self._call('GET', self._key(key, version))
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl_ms(timeout)
+        if ttl is None:
+            return bool(self._call('PERSIST', key) or self._call(
+                'EXISTS', key))
+        return bool(self._call('PEXPIRE', key, ttl))
+
+    def delete(self, key, version=None):
+        self._call('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._call(
+            'MGET', *(self._key(key, version) for key in keys))
+        return {
+            key: pickle.loads(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    def has_key(self, key, version=None):
+        return bool(self._call('EXISTS', self._key(key, version)))
+
+    def clear(self):
+        self._call('FLUSHDB')
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кэш: L1 - ограниченный LRU в памяти процесса,
+    L2 - общий для всех воркеров кэш из CACHES[OPTIONS['L2']].
+
+    Запись идёт сквозь оба уровня. Записи L1 живут не дольше L1_TIMEOUT
+    секунд, поэтому изменение, сделанное другим воркером, видно через
+    это время даже без явной инвалидации.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def stats(self):
+        """Счётчики попаданий, промахов и вытеснений этого процесса."""
+        with self._lock:
+            return dict(self._stats, l1_size=len(self._l1))
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+            self._stats['l1_hits'] += 1
+        return pickle.loads(value)
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        ttl = self._l1_timeout if timeout is None else min(
+            timeout, self._l1_timeout)
+        if ttl <= 0:
+            self._l1_delete(key)
+            return
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._max_entries:
+                self._l1.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _local_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        value = self._l1_get(local_key)
+        if value is not _MISSING:
+            return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._l1_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            value = self._l1_get(self._local_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.l2.get_many(missing, version=version)
+            self._count('l2_hits', len(shared))
+            self._count('misses', len(missing) - len(shared))
+            for key, value in shared.items():
+                self._l1_set(self._local_key(key, version), value)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self._l1_set(self._local_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(self._local_key(key, version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_delete(self._local_key(key, version))
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self._local_key(key, version))
+        self.l2.delete(key, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
@@ -0,0 +1,147 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_local = threading.local()
+_turn = itertools.count()
+_down_until = {}
+
+
+def _healthy(alias):
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError as error:
+        logger.warning('Реплика %s недоступна: %s', alias, error)
+        _down_until[alias] = (
+            time.monotonic() + settings.REPLICA_RETRY_SECONDS)
+        return False
+    return True
+
+
+def choose_replica():
+    """
+    Следующая по кругу живая реплика или None. Недоступная реплика
+    пропускается REPLICA_RETRY_SECONDS секунд.
+    """
+    replicas = settings.REPLICA_DATABASES
+    if not replicas:
+        return None
+    start = next(_turn)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if _healthy(alias):
+            return alias
+    return None
+
+
+def current_replica():
+    return getattr(_local, 'replica', None)
+
+
+@contextmanager
+def on_primary():
+    """Чтение внутри блока идёт в основную базу."""
+    replica = current_replica()
+    _local.replica = None
+    try:
+        yield
+    finally:
+        _local.replica = replica
+
+
+def catch_up(moment):
+    """
+    Переводит остаток запроса на основную базу, если реплики могли ещё
+    не получить запись, сделанную в moment: отставание реплик считается
+    не больше REPLICA_PIN_SECONDS. Иначе страницу со старыми данными
+    сохранили бы кэши под отметкой новой записи. Возвращает True, если
+    чтение переведено.
+    """
+    lag = timedelta(seconds=settings.REPLICA_PIN_SECONDS)
+    if current_replica() is None or timezone.now() - moment >= lag:
+        return False
+    _local.replica = None
+    return True
+
+
+def read_from_replica(view):
+    """
+    Читает модели REPLICA_APPS с реплики на время GET-запроса.
+
+    Пользователь, который недавно что-то записал, читает с основной
+    базы, пока не истечёт кука PIN_COOKIE, и видит свои изменения
+    несмотря на отставание реплик. Запросы, отличные от GET и HEAD,
+    всегда идут в основную базу и сами ставят эту куку.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return pin_to_primary(view)(request, *args, **kwargs)
+        replica = None
+        if PIN_COOKIE not in request.COOKIES:
+            replica = choose_replica()
+        _local.replica = replica
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _local.replica = None
+    return wrapper
+
+
+def pin_to_primary(view):
+    """
+    Закрепляет автора записи за основной базой на REPLICA_PIN_SECONDS.
+    Кука ставится только на редирект после запроса, отличного от GET и
+    HEAD: так заканчивается удачная запись, а открытая форма или форма
+    с ошибками отдаются страницей и ничего не меняют.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if (request.method not in SAFE_METHODS
+                and 300 <= response.status_code < 400
+                and settings.REPLICA_DATABASES
+                and settings.REPLICA_PIN_SECONDS):
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Чтение моделей из REPLICA_APPS внутри read_from_replica идёт на
+    выбранную реплику, остальное - в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in settings.REPLICA_APPS:
+            return current_replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, данные в них одни и те же.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит вместе с репликацией.
+        return db not in settings.REPLICA_DATABASES
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.redis_standin import RedisStandIn
+
+
+class Command(BaseCommand):
+    help = ('Запускает локальный сервер с протоколом Redis для '
+            'YATUBE_CACHE=redis без установленного Redis.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=6379)
+
+    def handle(self, *args, host, port, **options):
+        server = RedisStandIn(host, port)
+        self.stdout.write(f'Сервер кэша слушает {server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.template_warmup import compile_all, template_names
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что все шаблоны проекта компилируются.'
+
+    def handle(self, *args, **options):
+        errors = compile_all()
+        if errors:
+            raise CommandError('Шаблоны не компилируются:\n' + '\n'.join(
+                f'{name}: {error}' for name, error in errors))
+        self.stdout.write(self.style.SUCCESS(
+            f'Шаблонов проверено: {len(template_names())}'))
@@ -0,0 +1,250 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from bisect import bisect
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+# Верхние границы корзин гистограммы времени ответа, мс.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_local = threading.local()
+_MISSING = object()
+
+
+def current():
+    """Профиль запроса, который обрабатывается в этом потоке."""
+    return getattr(_local, 'profile', None)
+
+
+class RequestProfile:
+    """Счётчики одного запроса: SQL, шаблоны и обращения к кэшу."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Вложенные шаблоны и кэши поверх других кэшей не считаются
+        # второй раз.
+        self.template_depth = 0
+        self.cache_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - started
+
+    def server_timing(self, wall):
+        return ', '.join((
+            f'total;dur={wall * 1000:.1f}',
+            f'sql;desc="{self.sql_count} queries";'
+            f'dur={self.sql_time * 1000:.1f}',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+        ))
+
+
+_original_render = Template.render
+
+
+def _profiled_render(self, context):
+    profile = current()
+    if profile is None or profile.template_depth:
+        return _original_render(self, context)
+    profile.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        profile.template_depth -= 1
+        profile.template_time += time.perf_counter() - started
+
+
+def install():
+    """
+    Подключает замер шаблонов: Template.render подменяется один раз на
+    процесс, при старте приложения, если ProfilingMiddleware включён.
+    """
+    Template.render = _profiled_render
+
+
+def uninstall():
+    Template.render = _original_render
+
+
+def _instrument_cache(cache):
+    """Подменяет get и get_many экземпляра кэша считающими обёртками."""
+    if getattr(cache, '_profiled', False):
+        return
+    get, get_many = cache.get, cache.get_many
+
+    def profiled_get(key, default=None, version=None):
+        profile = current()
+        if profile is None or profile.cache_depth:
+            return get(key, default, version)
+        profile.cache_depth += 1
+        try:
+            value = get(key, _MISSING, version)
+        finally:
+            profile.cache_depth -= 1
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+
+    def profiled_get_many(keys, version=None):
+        profile = current()
+        if profile is None or profile.cache_depth:
+            return get_many(keys, version)
+        keys = list(keys)
+        profile.cache_depth += 1
+        try:
+            found = get_many(keys, version)
+        finally:
+            profile.cache_depth -= 1
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+
+    cache.get = profiled_get
+    cache.get_many = profiled_get_many
+    cache._profiled = True
+
+
+class Histograms:
+    """
+    Сводка по именам URL за время жизни процесса. У каждого процесса
+    сервера она своя.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, name, profile, wall):
+        wall_ms = wall * 1000
+        with self._lock:
+            view = self._views.setdefault(name, {
+                'count': 0, 'buckets': [0] * (len(BUCKETS_MS) + 1),
+                'total_ms': 0.0, 'max_ms': 0.0, 'sql_count': 0,
+                'sql_ms': 0.0, 'template_ms': 0.0, 'cache_hits': 0,
+                'cache_misses': 0,
+            })
+            view['count'] += 1
+            view['buckets'][bisect(BUCKETS_MS, wall_ms)] += 1
+            view['total_ms'] += wall_ms
+            view['max_ms'] = max(view['max_ms'], wall_ms)
+            view['sql_count'] += profile.sql_count
+            view['sql_ms'] += profile.sql_time * 1000
+            view['template_ms'] += profile.template_time * 1000
+            view['cache_hits'] += profile.cache_hits
+            view['cache_misses'] += profile.cache_misses
+
+    @staticmethod
+    def _percentile(buckets, count, share):
+        """Верхняя граница корзины, в которую попал перцентиль."""
+        seen = 0
+        for index, hits in enumerate(buckets):
+            seen += hits
+            if seen >= share * count:
+                break
+        return BUCKETS_MS[index] if index < len(BUCKETS_MS) else None
+
+    def snapshot(self):
+        with self._lock:
+            views = {name: dict(view, buckets=list(view['buckets']))
+                     for name, view in self._views.items()}
+        rows = []
+        for name, view in sorted(views.items()):
+            count = view['count']
+            rows.append(dict(
+                view,
+                name=name,
+                avg_ms=view['total_ms'] / count,
+                avg_sql_count=view['sql_count'] / count,
+                avg_sql_ms=view['sql_ms'] / count,
+                avg_template_ms=view['template_ms'] / count,
+                p50_ms=self._percentile(view['buckets'], count, 0.5),
+                p95_ms=self._percentile(view['buckets'], count, 0.95),
+            ))
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+histograms = Histograms()
+
+
+class ProfilingMiddleware:
+    """
+    Замеряет каждый запрос: общее время, число и время SQL-запросов,
+    время отрисовки шаблонов и попадания в кэш. Результат уходит в
+    заголовок Server-Timing и в сводку по именам URL; доля запросов
+    PROFILING['SAMPLE_RATE'] целиком снимается cProfile в DUMP_DIR.
+
+    Включается добавлением в начало MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = getattr(settings, 'PROFILING', {})
+        self.sample_rate = options.get('SAMPLE_RATE', 0)
+        self.dump_dir = options.get('DUMP_DIR', 'profiles')
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        for alias in settings.CACHES:
+            _instrument_cache(caches[alias])
+        profiler = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        _local.profile = profile
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(profile.execute))
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            _local.profile = None
+        wall = time.perf_counter() - started
+        name = self._view_name(request)
+        histograms.record(name, profile, wall)
+        response['Server-Timing'] = profile.server_timing(wall)
+        if profiler is not None:
+            self._dump(profiler, name)
+        return response
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '<unresolved>'
+        return match.view_name
+
+    def _dump(self, profiler, name):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        filename = (
+            f'{name.replace(":", "-")}-{time.time():.6f}-{os.getpid()}.prof')
+        profiler.dump_stats(os.path.join(self.dump_dir, filename))
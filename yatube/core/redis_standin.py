@@ -0,0 +1,155 @@
+import socketserver
+import threading
+import time
+
+
+class RedisStandIn:
+    """
+    Минимальный сервер с протоколом Redis внутри процесса.
+
+    Понимает ровно те команды, которыми пользуется RedisCache, и нужен
+    для тестов и локальной разработки без настоящего Redis.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._data = {}
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                db = 0
+                while True:
+                    command = standin._read_command(self.rfile)
+                    if command is None:
+                        return
+                    name = command[0].upper()
+                    if name == b'SELECT':
+                        db = int(command[1])
+                        reply = b'+OK\r\n'
+                    else:
+                        reply = standin.execute(db, name, command[1:])
+                    self.wfile.write(reply)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def dbsize(self, db=0):
+        with self._lock:
+            return len(self._data.get(db, {}))
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _read_command(rfile):
+        line = rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(rfile.readline()[1:-2])
+            args.append(rfile.read(length + 2)[:-2])
+        return args
+
+    @staticmethod
+    def _bulk(value):
+        if value is None:
+            return b'$-1\r\n'
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    @staticmethod
+    def _alive(store, key, now):
+        entry = store.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del store[key]
+            return None
+        return entry
+
+    def execute(self, db, name, args):
+        command = self._commands.get(name)
+        if command is None:
+            return b'-ERR unknown command\r\n'
+        with self._lock:
+            return command(
+                self, self._data.setdefault(db, {}), args, time.monotonic())
+
+    def _cmd_ping(self, store, args, now):
+        return b'+PONG\r\n'
+
+    def _cmd_get(self, store, args, now):
+        entry = self._alive(store, args[0], now)
+        return self._bulk(entry and entry[0])
+
+    def _cmd_mget(self, store, args, now):
+        entries = [self._alive(store, key, now) for key in args]
+        return b'*%d\r\n' % len(entries) + b''.join(
+            self._bulk(entry and entry[0]) for entry in entries)
+
+    def _cmd_set(self, store, args, now):
+        key, value, options = args[0], args[1], args[2:]
+        flags = [option.upper() for option in options]
+        if b'NX' in flags and self._alive(store, key, now):
+            return b'$-1\r\n'
+        expires = None
+        if b'PX' in flags:
+            expires = now + int(options[flags.index(b'PX') + 1]) / 1000
+        store[key] = (value, expires)
+        return b'+OK\r\n'
+
+    def _cmd_del(self, store, args, now):
+        return b':%d\r\n' % sum(
+            store.pop(key, None) is not None for key in args)
+
+    def _cmd_exists(self, store, args, now):
+        return b':%d\r\n' % sum(
+            self._alive(store, key, now) is not None for key in args)
+
+    def _cmd_pexpire(self, store, args, now):
+        return self._expire(store, args[0], now + int(args[1]) / 1000, now)
+
+    def _cmd_persist(self, store, args, now):
+        return self._expire(store, args[0], None, now)
+
+    def _expire(self, store, key, expires, now):
+        entry = self._alive(store, key, now)
+        if entry is None:
+            return b':0\r\n'
+        store[key] = (entry[0], expires)
+        return b':1\r\n'
+
+    def _cmd_flushdb(self, store, args, now):
+        store.clear()
+        return b'+OK\r\n'
+
+    def _cmd_dbsize(self, store, args, now):
+        return b':%d\r\n' % len(store)
+
+    _commands = {
+        b'PING': _cmd_ping,
+        b'GET': _cmd_get,
+        b'MGET': _cmd_mget,
+        b'SET': _cmd_set,
+        b'DEL': _cmd_del,
+        b'EXISTS': _cmd_exists,
+        b'PEXPIRE': _cmd_pexpire,
+        b'PERSIST': _cmd_persist,
+        b'FLUSHDB': _cmd_flushdb,
+        b'DBSIZE': _cmd_dbsize,
+    }
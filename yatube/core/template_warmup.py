@@ -0,0 +1,47 @@
+import logging
+import os
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.exceptions import TemplateDoesNotExist
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = ('.html', '.txt')
+
+
+def template_names():
+    """Имена всех шаблонов из TEMPLATES[...]['DIRS']."""
+    names = []
+    for engine in settings.TEMPLATES:
+        for directory in engine.get('DIRS', []):
+            for root, _, files in os.walk(directory):
+                names.extend(
+                    os.path.relpath(os.path.join(root, name), directory)
+                    .replace(os.sep, '/')
+                    for name in files if name.endswith(EXTENSIONS)
+                )
+    return sorted(set(names))
+
+
+def compile_all():
+    """
+    Компилирует каждый шаблон. С кэширующим загрузчиком результат
+    остаётся в памяти процесса, и первый запрос не читает диск.
+    Возвращает список (имя шаблона, ошибка).
+    """
+    engine = engines['django']
+    errors = []
+    for name in template_names():
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, TemplateDoesNotExist) as error:
+            errors.append((name, error))
+    return errors
+
+
+def warm_up():
+    errors = compile_all()
+    for name, error in errors:
+        logger.error('Шаблон %s не компилируется: %s', name, error)
+    return errors
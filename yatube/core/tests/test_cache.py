@@ -0,0 +1,114 @@
+import time
+
+from django.core.cache import caches
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache_backends import RedisCache, TieredCache
+from core.redis_standin import RedisStandIn
+from posts.models import Post, User
+from posts.tests.utils import run_on_commit
+
+
+class StandInServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RedisStandIn().start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    @classmethod
+    def tiered_caches(cls, max_entries=100):
+        return {
+            'default': {
+                'BACKEND': 'core.cache_backends.TieredCache',
+                'OPTIONS': {'L2': 'shared', 'MAX_ENTRIES': max_entries},
+            },
+            'shared': {
+                'BACKEND': 'core.cache_backends.RedisCache',
+                'LOCATION': cls.server.url,
+            },
+        }
+
+
+class RedisCacheTests(StandInServerMixin, SimpleTestCase):
+    def setUp(self):
+        self.cache = RedisCache(self.server.url, {})
+        self.cache.clear()
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'text': 'Пост'})
+        self.assertEqual(self.cache.get('key'), {'text': 'Пост'})
+        self.assertTrue(self.cache.has_key('key'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_does_not_overwrite(self):
+        """add не перезаписывает существующий ключ."""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_get_many_and_expiry(self):
+        """get_many пропускает отсутствующие и истёкшие ключи."""
+        self.cache.set('short', 1, timeout=0.05)
+        self.cache.set('long', 2)
+        time.sleep(0.1)
+        self.assertEqual(
+            self.cache.get_many(['short', 'long', 'absent']), {'long': 2})
+
+
+class TieredCacheTests(StandInServerMixin, SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_l1_serves_repeated_reads(self):
+        """Повторное чтение обслуживается из памяти процесса."""
+        with override_settings(CACHES=self.tiered_caches()):
+            cache = caches['default']
+            cache.set('key', 'value')
+            cache.get('key')
+            cache.get('key')
+            self.assertEqual(cache.stats()['l1_hits'], 2)
+
+    def test_l2_shared_between_workers(self):
+        """Второй процесс получает значение из общего уровня."""
+        with override_settings(CACHES=self.tiered_caches()):
+            caches['default'].set('key', 'value')
+            other_worker = TieredCache(
+                '', self.tiered_caches()['default'])
+            self.assertEqual(other_worker.get('key'), 'value')
+            self.assertEqual(other_worker.stats()['l2_hits'], 1)
+
+    def test_l1_is_bounded(self):
+        """L1 вытесняет давно не использованные записи."""
+        with override_settings(CACHES=self.tiered_caches(max_entries=2)):
+            cache = caches['default']
+            for key in ('a', 'b', 'c'):
+                cache.set(key, key)
+            stats = cache.stats()
+            self.assertEqual(stats['l1_size'], 2)
+            self.assertEqual(stats['evictions'], 1)
+            self.assertEqual(cache.get('a'), 'a')
+
+
+class TieredCacheViewsTests(StandInServerMixin, TestCase):
+    def test_post_cards_cached_in_shared_tier(self):
+        """Карточки постов попадают в общий кэш и обновляются при правке."""
+        with override_settings(CACHES=self.tiered_caches()):
+            user = User.objects.create_user(username='author')
+            post = Post.objects.create(author=user, text='Исходный текст')
+            client = Client()
+            self.assertContains(
+                client.get(reverse('posts:mane_page')), 'Исходный текст')
+            self.assertGreater(self.server.dbsize(), 0)
+            post.text = 'Новый текст'
+            with run_on_commit():
+                post.save()
+            self.assertContains(
+                client.get(reverse('posts:mane_page')), 'Новый текст')
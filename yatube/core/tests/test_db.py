@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+class SqlitePragmaTests(SimpleTestCase):
+    def test_new_connections_are_tuned(self):
+        """Каждое новое соединение с SQLite получает настройки."""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, 'db.sqlite3'),
+            ), alias='pragma_test')
+            try:
+                with wrapper.cursor() as cursor:
+                    values = {}
+                    for pragma in ('journal_mode', 'synchronous',
+                                   'busy_timeout', 'mmap_size'):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        values[pragma] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        self.assertEqual(values, {
+            'journal_mode': 'wal',
+            # NORMAL
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 2 ** 20,
+        })
@@ -0,0 +1,110 @@
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.base import Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from core.profiling import histograms
+from posts.models import Post, User
+
+PROFILED = ['core.profiling.ProfilingMiddleware'] + settings.MIDDLEWARE
+
+
+def timing(response, metric):
+    """Словарь параметров метрики из заголовка Server-Timing."""
+    for part in response['Server-Timing'].split(', '):
+        name, *params = part.split(';')
+        if name == metric:
+            return dict(
+                re.match(r'(\w+)="?([^"]*)"?', param).groups()
+                for param in params)
+    return None
+
+
+@override_settings(MIDDLEWARE=PROFILED)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # В тестах middleware включается без перезапуска приложения.
+        profiling.install()
+
+    @classmethod
+    def tearDownClass(cls):
+        profiling.uninstall()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        histograms.clear()
+
+    def test_server_timing_reports_sql_and_templates(self):
+        """Server-Timing содержит время, SQL и шаблоны."""
+        response = self.client.get(reverse('posts:mane_page'))
+        self.assertGreater(float(timing(response, 'total')['dur']), 0)
+        # Отметка свежести, посты страницы и карточки авторов на
+        # холодном кэше.
+        self.assertEqual(timing(response, 'sql')['desc'], '3 queries')
+        self.assertGreater(float(timing(response, 'tpl')['dur']), 0)
+
+    def test_cache_hits_and_misses_are_counted(self):
+        """Повторная отрисовка карточки попадает в кэш."""
+        first = self.client.get(reverse('posts:mane_page'))
+        second = self.client.get(reverse('posts:mane_page'))
+        first_hits, first_misses = map(
+            int, re.findall(r'\d+', timing(first, 'cache')['desc']))
+        second_hits, second_misses = map(
+            int, re.findall(r'\d+', timing(second, 'cache')['desc']))
+        self.assertGreater(first_misses, 0)
+        self.assertGreater(second_hits, first_hits)
+        self.assertLess(second_misses, first_misses)
+
+    def test_requests_are_aggregated_by_url_name(self):
+        """Запросы сводятся в гистограмму по имени URL."""
+        for _ in range(3):
+            self.client.get(reverse('posts:mane_page'))
+        view, = histograms.snapshot()
+        self.assertEqual(view['name'], 'posts:mane_page')
+        self.assertEqual(view['count'], 3)
+        self.assertEqual(sum(view['buckets']), 3)
+        self.assertEqual(view['sql_count'], 5)
+
+    def test_render_is_patched_once(self):
+        """Middleware больше не подменяет Template.render сам."""
+        profiling.uninstall()
+        try:
+            self.client.get(reverse('posts:mane_page'))
+            self.assertIs(Template.render, profiling._original_render)
+        finally:
+            profiling.install()
+
+    def test_sampled_requests_are_dumped(self):
+        """Выбранные запросы сохраняются в файлы cProfile."""
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(PROFILING={'SAMPLE_RATE': 1,
+                                          'DUMP_DIR': directory}):
+                self.client.get(reverse('posts:mane_page'))
+            dumps = os.listdir(directory)
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].startswith('posts-mane_page-'))
+
+    def test_stats_page_is_for_staff_only(self):
+        """Сводка открывается только персоналу."""
+        self.client.get(reverse('posts:mane_page'))
+        response = self.client.get(reverse('profiling'))
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('profiling'))
+        self.assertContains(response, 'posts:mane_page')
+        self.assertContains(response, f'pid {os.getpid()}')
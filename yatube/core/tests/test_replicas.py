@@ -0,0 +1,170 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import db_router
+from posts.models import Follow, Post, User
+
+REPLICA = 'replica_test'
+BROKEN = 'replica_broken'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Реплика - отдельный файл SQLite, в который основная база копируется
+    только по вызову replicate(); до него реплика отстаёт.
+    """
+    databases = {'default', REPLICA, BROKEN}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        default = connections.databases['default']
+        connections.databases[REPLICA] = dict(
+            default, NAME=os.path.join(cls.directory.name, 'replica.db'))
+        connections.databases[BROKEN] = dict(
+            default, NAME=os.path.join(cls.directory.name, 'no', 'such.db'))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in (REPLICA, BROKEN):
+            connections[alias].close()
+            del connections.databases[alias]
+        cls.directory.cleanup()
+
+    def _fixture_teardown(self):
+        # Реплика перезаписывается копией основной базы в setUp, а
+        # недоступную и очищать нечего.
+        call_command('flush', verbosity=0, interactive=False,
+                     database='default', inhibit_post_migrate=True)
+
+    def replicate(self):
+        source = connections['default']
+        target = connections[REPLICA]
+        source.ensure_connection()
+        target.ensure_connection()
+        source.connection.backup(target.connection)
+
+    def later(self):
+        """Минута после записей: роутер считает, что реплики их догнали."""
+        return mock.patch.object(
+            db_router.timezone, 'now',
+            return_value=timezone.now() + timedelta(minutes=1))
+
+    def setUp(self):
+        cache.clear()
+        db_router._down_until.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.replicate()
+        Post.objects.create(author=self.author, text='Свежий пост')
+
+    def test_feeds_read_from_replica(self):
+        """Ленты гостя читаются с отстающей реплики."""
+        for url in (reverse('posts:mane_page'),
+                    reverse('posts:profile', args=('author',))):
+            with self.subTest(url=url):
+                with self.later():
+                    response = self.client.get(url)
+                self.assertContains(response, 'Старый пост')
+                self.assertNotContains(response, 'Свежий пост')
+
+    def test_replica_catches_up(self):
+        """После репликации на реплике видны новые посты."""
+        self.replicate()
+        response = self.client.get(reverse('posts:mane_page'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_writer_is_pinned_to_primary(self):
+        """Написавший пост сразу видит его, хотя реплика отстаёт."""
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Только что'})
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('posts:profile', args=('author',)))
+        self.assertContains(response, 'Только что')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_only_successful_writes_pin(self):
+        """Открытая форма и отклонённый пост не закрепляют за основной."""
+        self.client.force_login(self.author)
+        url = reverse('posts:post_create')
+        response = self.client.get(url)
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+        response = self.client.post(url, {'text': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_pin_expires(self):
+        """Без закрепления пользователь снова читает с реплики."""
+        self.client.force_login(self.author)
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            response = self.client.post(
+                reverse('posts:post_create'), {'text': 'Только что'})
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+        with self.later():
+            response = self.client.get(
+                reverse('posts:profile', args=('author',)))
+        self.assertNotContains(response, 'Только что')
+
+    @override_settings(PAGE_CACHE_SECONDS=60)
+    def test_recent_write_is_not_cached_from_replica(self):
+        """Страницу со свежей отметкой кэш получает с основной базы."""
+        url = reverse('posts:mane_page')
+        self.assertContains(self.client.get(url), 'Свежий пост')
+        with self.later():
+            response = self.client.get(url)
+        self.assertContains(response, 'Свежий пост')
+
+    def test_recent_card_is_not_cached_from_replica(self):
+        """Карточку недавно изменённого поста лента подписок берёт с
+        основной базы и не кэширует старый текст под новой версией."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.replicate()
+        post = Post.objects.get(text='Свежий пост')
+        post.text = 'Исправленный пост'
+        post.save()
+        self.client.force_login(reader)
+        url = reverse('posts:follow_index')
+        self.assertContains(self.client.get(url), 'Исправленный пост')
+        with self.later():
+            response = self.client.get(url)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_writes_always_go_to_primary(self):
+        """Даже внутри чтения с реплики запись идёт в основную базу."""
+        with self.settings(REPLICA_DATABASES=[REPLICA]):
+            db_router._local.replica = REPLICA
+            try:
+                Post.objects.create(author=self.author, text='Запись')
+            finally:
+                db_router._local.replica = None
+        self.assertTrue(
+            Post.objects.using('default').filter(text='Запись').exists())
+
+    def test_round_robin_skips_broken_replica(self):
+        """Реплики выбираются по кругу, недоступная пропускается."""
+        with self.settings(REPLICA_DATABASES=[BROKEN, REPLICA]):
+            with self.assertLogs('core.db_router', 'WARNING'):
+                chosen = {db_router.choose_replica() for _ in range(4)}
+        self.assertEqual(chosen, {REPLICA})
+        self.assertIn(BROKEN, db_router._down_until)
+
+    def test_without_healthy_replicas_reads_primary(self):
+        """Без живых реплик ленты читаются с основной базы."""
+        with self.settings(REPLICA_DATABASES=[BROKEN]):
+            with self.assertLogs('core.db_router', 'WARNING'):
+                response = self.client.get(reverse('posts:mane_page'))
+        self.assertContains(response, 'Свежий пост')
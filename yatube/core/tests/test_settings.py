@@ -0,0 +1,32 @@
+import os
+import runpy
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+SETTINGS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'yatube', 'settings.py')
+
+
+class SecretKeyTests(SimpleTestCase):
+    def load(self, **env):
+        environ = {key: value for key, value in os.environ.items()
+                   if key != 'YATUBE_SECRET_KEY'}
+        environ.update(env)
+        with mock.patch.dict(os.environ, environ, clear=True):
+            return runpy.run_path(SETTINGS)
+
+    def test_prod_requires_secret_key(self):
+        """В prod без YATUBE_SECRET_KEY настройки не загружаются."""
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(YATUBE_ENV='prod')
+
+    def test_prod_uses_given_key(self):
+        self.assertEqual(
+            self.load(YATUBE_ENV='prod', YATUBE_SECRET_KEY='секрет')[
+                'SECRET_KEY'], 'секрет')
+
+    def test_dev_falls_back_to_repository_key(self):
+        self.assertTrue(self.load(YATUBE_ENV='dev')['SECRET_KEY'])
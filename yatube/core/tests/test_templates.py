@@ -0,0 +1,41 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.template_warmup import compile_all, template_names
+
+
+def templates_in(directory):
+    engine = dict(settings.TEMPLATES[0], DIRS=[directory])
+    return override_settings(TEMPLATES=[engine])
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def test_project_templates_compile(self):
+        """Все шаблоны проекта находятся и компилируются."""
+        names = template_names()
+        self.assertIn('base.html', names)
+        self.assertIn('includes/post_card.html', names)
+        self.assertEqual(compile_all(), [])
+
+    def test_check_templates_fails_on_broken_template(self):
+        """Команда падает и называет сломанный шаблон."""
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'includes'))
+            with open(os.path.join(directory, 'includes', 'broken.html'),
+                      'w') as file:
+                file.write('{% if %}')
+            with templates_in(directory):
+                with self.assertRaisesMessage(
+                        CommandError, 'includes/broken.html'):
+                    call_command('check_templates', stdout=StringIO())
+
+    def test_check_templates_passes(self):
+        """Для исправных шаблонов команда сообщает их число."""
+        out = StringIO()
+        call_command('check_templates', stdout=out)
+        self.assertIn(str(len(template_names())), out.getvalue())
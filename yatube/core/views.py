@@ -1,5 +1,10 @@
+import os
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from .profiling import BUCKETS_MS, histograms
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,14 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profiling_stats(request):
+    if request.method == 'POST':
+        histograms.clear()
+    return render(request, 'core/profiling.html', {
+        'views': histograms.snapshot(),
+        'buckets': BUCKETS_MS,
+        'pid': os.getpid(),
+    })
@@ -1,17 +1,134 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
 
+from . import bulk, export
+from .changelist import (
+    KeysetChangeList, YearFilter, estimated_count, group_choices,
+)
 from .models import Follow, Group, Post, Comment
 
 
+def export_action(kind, output_format):
+    """Действие админки: выбранные строки потоком в файл."""
+    def action(modeladmin, request, queryset):
+        response = StreamingHttpResponse(
+            export.stream(kind, queryset, output_format),
+            content_type=export.FORMATS[output_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.{output_format}"')
+        return response
+    action.__name__ = f'export_{output_format}'
+    action.short_description = f'Выгрузить в {output_format.upper()}'
+    return action
+
+
+def export_actions(kind):
+    return [export_action(kind, output_format)
+            for output_format in export.FORMATS]
+
+
+class PostActionForm(helpers.ActionForm):
+    """
+    Панель действий с выбором группы для переноса постов. Форма общая
+    для всех действий, поэтому группу требует само move_posts; убрать
+    группу можно только отдельным действием clear_group.
+    """
+    group = forms.TypedChoiceField(
+        label='Группа', required=False, coerce=int, empty_value=None,
+        choices=lambda: group_choices('---------'))
+
+
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', YearFilter)
     empty_value_display = '-пусто-'
+    actions = export_actions('posts') + [
+        'move_posts', 'clear_group', 'delete_posts']
+    action_form = PostActionForm
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group':
+            field.choices = group_choices(field.empty_label)
+        return field
+
+    def get_actions(self, request):
+        # Стандартное удаление собирает в Python все комментарии постов.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def _move(self, request, queryset, group):
+        result = bulk.move_posts(queryset, group)
+        self.message_user(
+            request, f'Перенесено постов: {result["posts"]} '
+                     f'за {result["seconds"]:.2f} с.')
+
+    def move_posts(self, request, queryset):
+        try:
+            group_id = PostActionForm.base_fields['group'].clean(
+                request.POST.get('group'))
+        except ValidationError:
+            group_id = None
+        group = Group.objects.filter(pk=group_id).first()
+        if group is None:
+            self.message_user(
+                request, 'Выберите группу, в которую перенести посты.',
+                messages.ERROR)
+            return None
+        self._move(request, queryset, group)
+        return None
+    move_posts.short_description = 'Перенести в выбранную группу'
+    move_posts.allowed_permissions = ('change',)
+
+    def clear_group(self, request, queryset):
+        self._move(request, queryset, None)
+        return None
+    clear_group.short_description = 'Убрать группу у выбранных постов'
+    clear_group.allowed_permissions = ('change',)
+
+    def delete_posts(self, request, queryset):
+        if request.POST.get('post') != 'yes':
+            count, estimated = estimated_count(queryset)
+            return TemplateResponse(
+                request, 'admin/posts/post/delete_posts_confirmation.html',
+                dict(self.admin_site.each_context(request),
+                     opts=self.model._meta,
+                     title='Удалить посты?',
+                     count=count, estimated=estimated,
+                     selected=request.POST.getlist(
+                         helpers.ACTION_CHECKBOX_NAME),
+                     select_across=request.POST.get('select_across', '0'),
+                     action_checkbox_name=helpers.ACTION_CHECKBOX_NAME))
+        result = bulk.delete_posts(queryset)
+        self.message_user(
+            request, f'Удалено постов: {result["posts"]}, комментариев: '
+                     f'{result["comments"]} за {result["seconds"]:.2f} с.')
+        return None
+    delete_posts.short_description = 'Удалить выбранные посты'
+    delete_posts.allowed_permissions = ('delete',)
+
+
+class CommentAdmin(admin.ModelAdmin):
+    actions = export_actions('comments')
+
+
+class FollowAdmin(admin.ModelAdmin):
+    actions = export_actions('follows')
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
-admin.site.register(Follow)
-admin.site.register(Comment)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(Comment, CommentAdmin)
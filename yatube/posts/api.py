@@ -0,0 +1,158 @@
+import json
+
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+
+from core.db_router import read_from_replica
+
+from . import freshness
+from .freshness import conditional_page
+from .models import Group, Post, User
+from .page_cache import cached_page
+from .timeline import timeline_paginator
+from .utils import POSTS_PER_PAGE, CursorPaginator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Поле ответа и колонка, из которой оно берётся. Посты читаются через
+# values(): без моделей, только запрошенные колонки.
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+DEFAULT_FIELDS = ('id', 'text', 'pub_date', 'author', 'group', 'image')
+# Без них не построить курсор.
+KEY_COLUMNS = ('id', 'pub_date')
+
+
+def _default(value):
+    return value.isoformat()
+
+
+def dumps(data):
+    """JSON в байтах: orjson, если он установлен, иначе json."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(
+        data, ensure_ascii=False, separators=(',', ':'),
+        default=_default).encode()
+
+
+def loads(line):
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        dumps(data), content_type='application/json', status=status)
+
+
+def error(status, message):
+    return json_response({'error': message}, status)
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def selected_fields(request):
+    """Поля из ?fields=id,text; по умолчанию DEFAULT_FIELDS."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return DEFAULT_FIELDS
+    fields = tuple(field.strip() for field in fields.split(','))
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(FIELDS)}.')
+    return fields
+
+
+def project(posts, fields):
+    columns = {FIELDS[field] for field in fields}.union(KEY_COLUMNS)
+    return posts.values(*columns)
+
+
+def serialize(row, fields):
+    item = {field: row[FIELDS[field]] for field in fields}
+    if 'image' in item:
+        item['image'] = (
+            default_storage.url(item['image']) if item['image'] else None)
+    return item
+
+
+def feed(request, posts, paginator_class=CursorPaginator):
+    """Страница ленты по курсору, как в HTML-версии."""
+    try:
+        fields = selected_fields(request)
+    except FieldsError as exc:
+        return error(400, str(exc))
+    page = paginator_class(
+        project(posts, fields), POSTS_PER_PAGE).get_page(
+            cursor=request.GET.get('cursor'))
+    return json_response({
+        'results': [serialize(row, fields) for row in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@read_from_replica
+@conditional_page(freshness.index_scopes, max_age=30)
+@cached_page
+def index(request):
+    return feed(request, Post.objects.all())
+
+
+@read_from_replica
+@conditional_page(freshness.group_scopes, max_age=60)
+@cached_page
+def group_posts(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug).values_list('pk', flat=True).first()
+    if group_id is None:
+        return error(404, 'Группа не найдена.')
+    return feed(request, Post.objects.filter(group_id=group_id))
+
+
+@read_from_replica
+@conditional_page(freshness.author_scopes, max_age=60)
+@cached_page
+def profile(request, username):
+    author_id = User.objects.filter(
+        username=username).values_list('pk', flat=True).first()
+    if author_id is None:
+        return error(404, 'Пользователь не найден.')
+    return feed(request, Post.objects.filter(author_id=author_id))
+
+
+@read_from_replica
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Лента подписок доступна после входа.')
+    return feed(request, Post.objects.all(),
+                timeline_paginator(request.user))
+
+
+@read_from_replica
+@conditional_page(freshness.post_detail_scopes, max_age=60)
+def post_detail(request, post_id):
+    try:
+        fields = selected_fields(request)
+    except FieldsError as exc:
+        return error(400, str(exc))
+    row = project(Post.objects.filter(pk=post_id), fields).first()
+    if row is None:
+        return error(404, 'Пост не найден.')
+    return json_response(serialize(row, fields))
@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.urls import reverse
+
+from .models import User
+
+CARD_KEY = 'author_card:{}'
+CARD_TIMEOUT = 24 * 60 * 60
+
+
+def _card(user):
+    return {
+        'name': user.get_full_name(),
+        'username': user.username,
+        'url': reverse('posts:profile', args=(user.username,)),
+    }
+
+
+def get_cards(user_ids):
+    """
+    Имя, username и адрес профиля авторов по их id. Недостающие в кэше
+    карточки читаются одним запросом и сразу кладутся в кэш.
+    """
+    keys = {CARD_KEY.format(pk): pk for pk in set(user_ids)}
+    cached = cache.get_many(keys)
+    cards = {keys[key]: card for key, card in cached.items()}
+    missing = [pk for key, pk in keys.items() if key not in cached]
+    if missing:
+        fresh = {
+            user.pk: _card(user)
+            for user in User.objects.filter(pk__in=missing).only(
+                'username', 'first_name', 'last_name')
+        }
+        cache.set_many(
+            {CARD_KEY.format(pk): card for pk, card in fresh.items()},
+            CARD_TIMEOUT)
+        cards.update(fresh)
+    return cards
+
+
+def attach(posts):
+    """Проставляет постам страницы post.author_card."""
+    posts = list(posts)
+    cards = get_cards(post.author_id for post in posts)
+    for post in posts:
+        post.author_card = cards.get(post.author_id)
+
+
+def forget(user_id):
+    cache.delete(CARD_KEY.format(user_id))
@@ -0,0 +1,112 @@
+import json
+import time
+import tracemalloc
+
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, UserStats
+
+
+def targets():
+    """
+    Адреса для замера: для каждой страницы берётся самый тяжёлый
+    случай из имеющихся данных. Возвращает (имя, url, пользователь).
+    """
+    reader = UserStats.objects.order_by('-following_count').first()
+    author = UserStats.objects.order_by('-posts_count').first()
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    group = Group.objects.annotate(
+        total=Count('posts')).order_by('-total').first()
+    if None in (reader, author, post, group):
+        raise ValueError(
+            'Для замеров нужны пользователи, посты и группы; '
+            'наполните базу командой seed_yatube.')
+    return [
+        ('index', reverse('posts:mane_page'), None),
+        ('group_posts', reverse('posts:groups', args=(group.slug,)), None),
+        ('profile',
+         reverse('posts:profile', args=(author.user.username,)), None),
+        ('post_detail', reverse('posts:post_detail', args=(post.pk,)), None),
+        ('follow_index', reverse('posts:follow_index'), reader.user),
+    ]
+
+
+def percentile(values, share):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(int(round(share * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def measure(client, url, repeat):
+    """Задержки, число запросов и пиковая память одной страницы."""
+    client.get(url)
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        # Следующий запрос очистит журнал SQL, число берётся сразу.
+        query_count = len(queries.captured_queries)
+    # tracemalloc замедляет код, поэтому память меряется отдельно.
+    tracemalloc.start()
+    client.get(url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'queries': query_count,
+        'peak_memory_kb': peak // 1024,
+    }
+
+
+def run(repeat=20):
+    results = {}
+    for name, url, user in targets():
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        results[name] = measure(client, url, repeat)
+    return results
+
+
+COMPARED = ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb')
+
+
+def compare(results, baseline, tolerance):
+    """
+    Список регрессий относительно сохранённого базового прогона.
+    Время и память могут вырасти на долю tolerance, число запросов -
+    нисколько.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in COMPARED:
+            allowed = base[metric] * (1 + tolerance)
+            if metric == 'queries':
+                allowed = base[metric]
+            if metrics[metric] > allowed:
+                regressions.append(
+                    f'{name}.{metric}: {base[metric]} -> {metrics[metric]}')
+    return regressions
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save(results, path):
+    with open(path, 'w') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,88 @@
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import card_cache, counters, freshness, search, thumbnails
+from .models import Comment, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _batches(queryset, batch_size):
+    """Строки (id, автор, группа) пачками по возрастанию id."""
+    queryset = queryset.order_by('pk').values_list(
+        'pk', 'author_id', 'group_id')
+    last = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last)[:batch_size])
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1][0]
+
+
+def _raw_delete(queryset):
+    # Collector перед DELETE читает каждую зависимую строку в Python ради
+    # сигналов и каскадов; их работу здесь делает сам модуль.
+    return queryset._raw_delete(queryset.db)
+
+
+def _after_commit(batch, *group_ids):
+    """Карточки и отметки свежести пачки - после записи транзакции."""
+    post_ids = [pk for pk, _, _ in batch]
+    scopes = {('index', None)}
+    for pk, author_id, group_id in batch:
+        scopes.update({('post', pk), ('author', author_id)})
+        if group_id:
+            scopes.add(('group', group_id))
+    scopes.update(('group', pk) for pk in group_ids if pk)
+
+    def refresh():
+        card_cache.bump_many('post', post_ids)
+        freshness.touch(*scopes)
+
+    transaction.on_commit(refresh)
+
+
+def move_posts(queryset, group, batch_size=BATCH_SIZE):
+    """
+    Переносит посты в группу group (None - убрать группу) пачками по
+    одному UPDATE, без post_save на каждую строку. Возвращает число
+    перенесённых постов и время в секундах.
+    """
+    started = time.perf_counter()
+    group_id = group.pk if group is not None else None
+    moved = 0
+    for batch in _batches(queryset.exclude(group_id=group_id), batch_size):
+        with transaction.atomic():
+            moved += Post.objects.filter(
+                pk__in=[pk for pk, _, _ in batch]
+            ).update(group_id=group_id, updated=timezone.now())
+            _after_commit(batch, group_id)
+    return {'posts': moved, 'seconds': time.perf_counter() - started}
+
+
+def delete_posts(queryset, batch_size=BATCH_SIZE):
+    """
+    Удаляет посты пачками: на пачку по одному DELETE для поиска, лент,
+    комментариев и самих постов, затем пересчёт счётчиков авторов.
+    Возвращает число удалённых постов и комментариев и время.
+    """
+    started = time.perf_counter()
+    posts = comments = 0
+    for batch in _batches(queryset, batch_size):
+        post_ids = [pk for pk, _, _ in batch]
+        with transaction.atomic():
+            thumbnails.remove(Post.objects.filter(
+                pk__in=post_ids).values_list('image', flat=True))
+            search.remove_posts(post_ids)
+            _raw_delete(TimelineEntry.objects.filter(post_id__in=post_ids))
+            comments += _raw_delete(
+                Comment.objects.filter(post_id__in=post_ids))
+            posts += _raw_delete(Post.objects.filter(pk__in=post_ids))
+            counters.recount_users({author_id for _, author_id, _ in batch})
+            _after_commit(batch)
+    return {'posts': posts, 'comments': comments,
+            'seconds': time.perf_counter() - started}
@@ -0,0 +1,39 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+VERSION_KEY = 'post_card_version:{}:{}'
+
+
+def _version_key(kind, pk):
+    return VERSION_KEY.format(kind, pk)
+
+
+def bump(kind, pk):
+    """
+    Выдаёт новую версию посту, группе или автору.
+
+    Версия - случайный токен, а не счётчик: если ключ вытеснен из кэша,
+    новая версия не совпадёт ни с одной прежней и устаревший фрагмент
+    не вернётся.
+    """
+    cache.set(_version_key(kind, pk), uuid4().hex, None)
+
+
+def card_version(post):
+    """Составная версия карточки поста: пост, группа и автор."""
+    keys = [_version_key('post', post.pk),
+            _version_key('author', post.author_id)]
+    if post.group_id:
+        keys.append(_version_key('group', post.group_id))
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def bump_many(kind, pks):
+    """Новые версии сразу многим записям одним обращением к кэшу."""
+    cache.set_many({_version_key(kind, pk): uuid4().hex for pk in pks}, None)
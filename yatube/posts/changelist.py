@@ -0,0 +1,154 @@
+from datetime import datetime
+
+from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .models import Group
+from .utils import CursorPaginator
+
+CURSOR_VAR = 'cursor'
+GROUP_CHOICES_KEY = 'admin_group_choices'
+
+
+def _postgresql_estimate(cursor, table):
+    cursor.execute(
+        'SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+    row = cursor.fetchone()
+    # До первого ANALYZE reltuples равен -1 (или 0 в старых версиях).
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+def _sqlite_estimate(cursor, table):
+    try:
+        cursor.execute(
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+    except DatabaseError:
+        # ANALYZE ещё не запускали, таблицы статистики нет.
+        return None
+    row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+ESTIMATES = {
+    'postgresql': _postgresql_estimate,
+    'sqlite': _sqlite_estimate,
+}
+
+
+def estimated_count(queryset):
+    """
+    Число строк и признак, что оно примерное. Без условий число берётся
+    из статистики базы; если её нет или запрос с условиями - COUNT.
+    """
+    if not queryset.query.where:
+        connection = connections[queryset.db]
+        estimate = ESTIMATES.get(connection.vendor)
+        if estimate is not None:
+            with connection.cursor() as cursor:
+                rows = estimate(cursor, queryset.model._meta.db_table)
+            if rows is not None:
+                return rows, True
+    return queryset.count(), False
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Список постов в админке страницами по курсору (pub_date, id), как
+    ленты сайта: дальние страницы не читают пропущенные строки. При
+    сортировке по колонке и «Показать все» работает обычная пагинация
+    с точным COUNT: по нему считаются ссылки на страницы.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.page = None
+        self.count_is_estimated = False
+        super().__init__(request, *args, **kwargs)
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        if ORDER_VAR in self.params or self.show_all:
+            return super().get_results(request)
+        # Курсор ищется по узкому индексу, строки со связями читаются
+        # потом одним запросом по id.
+        paginator = CursorPaginator(
+            self.queryset.select_related(None).only('pk', 'pub_date'),
+            self.list_per_page)
+        self.page = paginator.get_page(cursor=self.cursor)
+        ids = [post.pk for post in self.page]
+        # Число только подписывает список: страницы от него не зависят.
+        self.result_count, self.count_is_estimated = estimated_count(
+            self.queryset)
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = self.queryset.filter(pk__in=ids).order_by(
+            '-pub_date', '-pk')
+        self.can_show_all = False
+        self.multi_page = self.page.has_other_pages()
+        self.paginator = paginator
+
+    def cursor_url(self, cursor):
+        return self.get_query_string({CURSOR_VAR: cursor})
+
+    @property
+    def next_url(self):
+        return self.page and self.page.next_cursor and self.cursor_url(
+            self.page.next_cursor)
+
+    @property
+    def previous_url(self):
+        return self.page and self.page.previous_cursor and self.cursor_url(
+            self.page.previous_cursor)
+
+
+class YearFilter(admin.SimpleListFilter):
+    """
+    Год публикации. Годы берутся из первой и последней даты по индексу,
+    а не из DISTINCT по всей таблице, как у date_hierarchy.
+    """
+    title = 'год публикации'
+    parameter_name = 'year'
+
+    def lookups(self, request, model_admin):
+        dates = model_admin.model.objects.order_by('pub_date').values_list(
+            'pub_date', flat=True)
+        first, last = dates.first(), dates.last()
+        if first is None:
+            return []
+        first, last = timezone.localtime(first), timezone.localtime(last)
+        return [(str(year), str(year))
+                for year in range(last.year, first.year - 1, -1)]
+
+    def queryset(self, request, queryset):
+        if not self.value() or not self.value().isdigit():
+            return queryset
+        year = int(self.value())
+        start = timezone.make_aware(datetime(year, 1, 1))
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+        return queryset.filter(pub_date__gte=start, pub_date__lt=end)
+
+
+def group_choices(empty_label):
+    """
+    Варианты группы для строк списка. Один раз на все строки и из кэша:
+    иначе каждая строка с list_editable заново читает все группы.
+    """
+    choices = cache.get(GROUP_CHOICES_KEY)
+    if choices is None:
+        choices = list(Group.objects.order_by('title').values_list(
+            'pk', 'title'))
+        cache.set(GROUP_CHOICES_KEY, choices, None)
+    return [('', empty_label)] + choices
+
+
+def forget_group_choices():
+    cache.delete(GROUP_CHOICES_KEY)
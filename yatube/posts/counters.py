@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _bump(queryset, field, delta):
+    """Сдвигает счётчик, не опуская его ниже нуля при расхождении."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    _bump(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_comments(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def get_stats(user):
+    """Счётчики пользователя; недостающая строка досчитывается на месте."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        recount_users([user.pk])
+        return UserStats.objects.get(user=user)
+
+
+def _count(model, field):
+    totals = (
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def recount_users(user_ids):
+    """Пересчитывает счётчики пользователей с нуля."""
+    users = User.objects.filter(pk__in=user_ids).annotate(
+        posts_total=_count(Post, 'author'),
+        followers_total=_count(Follow, 'author'),
+        following_total=_count(Follow, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+    stats = [
+        UserStats(user_id=pk, posts_count=posts, followers_count=followers,
+                  following_count=following)
+        for pk, posts, followers, following in users
+    ]
+    with transaction.atomic():
+        UserStats.objects.filter(user_id__in=user_ids).delete()
+        UserStats.objects.bulk_create(stats)
+    return len(stats)
+
+
+def recount_posts(post_ids):
+    """Пересчитывает количество комментариев у постов."""
+    posts = list(
+        Post.objects.filter(pk__in=post_ids)
+        .annotate(comments_total=_count(Comment, 'post'))
+        .only('pk')
+    )
+    for post in posts:
+        post.comments_count = post.comments_total
+    Post.objects.bulk_update(posts, ['comments_count'])
+    return len(posts)
@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Post, Comment
+from .uploads import process_image
 
 
 class PostForm(forms.ModelForm):
@@ -9,6 +11,23 @@ class PostForm(forms.ModelForm):
         fields = ('text', 'group', 'image')
         labels = {'text': 'Текст поста', 'group': 'Группа'}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rejected_image = None
+        image = self.files.get(self.add_prefix('image'))
+        if getattr(image, 'rejected', None):
+            self.rejected_image = image.rejected
+            self.files = self.files.copy()
+            del self.files[self.add_prefix('image')]
+
+    def clean_image(self):
+        if self.rejected_image:
+            raise forms.ValidationError(self.rejected_image)
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return process_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,185 @@
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core.db_router import catch_up, on_primary
+
+from .models import Comment, Group, Post, User
+
+STAMP_KEY = 'freshness:{}:{}'
+# Момент изменения пустой области: раньше любой настоящей записи.
+EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _newest(*dates):
+    return max((date for date in dates if date is not None), default=EPOCH)
+
+
+def _from_db(kind, pk):
+    """Время последнего изменения области по самим данным."""
+    if kind == 'index':
+        posts = Post.objects.all()
+    elif kind == 'group':
+        posts = Post.objects.filter(group_id=pk)
+    elif kind == 'author':
+        posts = Post.objects.filter(author_id=pk)
+    else:
+        return _newest(
+            Post.objects.filter(pk=pk).values_list(
+                'updated', flat=True).first(),
+            Comment.objects.filter(post_id=pk).aggregate(
+                newest=Max('created'))['newest'],
+        )
+    return _newest(posts.order_by().aggregate(newest=Max('updated'))['newest'])
+
+
+def last_modified(scopes):
+    """
+    Самое позднее изменение среди областей вида ('group', id).
+
+    Отметки лежат в кэше и сдвигаются сигналами при каждом изменении;
+    на промахе кэша отметка считается по pub_date и updated постов и
+    created комментариев в основной базе.
+    """
+    keys = {STAMP_KEY.format(kind, pk): (kind, pk) for kind, pk in scopes}
+    stamps = cache.get_many(keys)
+    for key, scope in keys.items():
+        if key not in stamps:
+            with on_primary():
+                cache.add(key, _from_db(*scope), None)
+            stamps[key] = cache.get(key)
+    return _newest(*stamps.values())
+
+
+def touch(*scopes):
+    now = timezone.now()
+    cache.set_many(
+        {STAMP_KEY.format(kind, pk): now for kind, pk in scopes}, None)
+
+
+def post_scopes(post):
+    scopes = [('index', None), ('post', post.pk),
+              ('author', post.author_id)]
+    if post.group_id:
+        scopes.append(('group', post.group_id))
+    return scopes
+
+
+def card_scopes(posts):
+    """Области карточек: сами посты и их группы."""
+    scopes = set()
+    for post in posts:
+        scopes.add(('post', post.pk))
+        if post.group_id:
+            scopes.add(('group', post.group_id))
+    return scopes
+
+
+def group_change_scopes(group_id):
+    """Название группы видно на ленте, её странице и в профилях авторов."""
+    author_ids = Post.objects.filter(group_id=group_id).order_by(
+    ).values_list('author_id', flat=True).distinct()
+    return [('index', None), ('group', group_id)] + [
+        ('author', pk) for pk in author_ids]
+
+
+def author_change_scopes(user_id):
+    """Имя автора видно на ленте, в профиле и в группах его постов."""
+    group_ids = Post.objects.filter(author_id=user_id).exclude(
+        group=None).order_by().values_list('group_id', flat=True).distinct()
+    return [('index', None), ('author', user_id)] + [
+        ('group', pk) for pk in group_ids]
+
+
+def request_stamp(request, scopes, args, kwargs):
+    """
+    Отметка областей страницы, посчитанная один раз за запрос: её
+    спрашивают и ETag, и Last-Modified, и кэш страниц. Если области
+    менялись недавно, страница читается с основной базы.
+    """
+    if not hasattr(request, 'freshness_stamp'):
+        # Области читаются с основной базы: по отстающей реплике новый
+        # пост выглядел бы несуществующим.
+        with on_primary():
+            request.freshness_stamp = last_modified(scopes(*args, **kwargs))
+    catch_up(request.freshness_stamp)
+    return request.freshness_stamp
+
+
+def page_etag(stamp, user):
+    return md5(f'{stamp.isoformat()}|{user.pk}'.encode()).hexdigest()
+
+
+def patch_page_cache_control(response, user, max_age):
+    if user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+
+
+def conditional_page(scopes, max_age):
+    """
+    Отвечает 304 до отрисовки шаблона, если область страницы не менялась.
+
+    scopes получает аргументы view и возвращает её области. ETag
+    учитывает пользователя: страница для гостя и для автора разная.
+    Last-Modified отдаётся только гостям, иначе после входа браузер
+    получил бы 304 на гостевую копию. Гостям страница кэшируется на
+    max_age секунд, остальным - только с перепроверкой.
+    """
+    def decorator(view):
+        def etag(request, *args, **kwargs):
+            return page_etag(
+                request_stamp(request, scopes, args, kwargs), request.user)
+
+        def modified(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return None
+            return request_stamp(request, scopes, args, kwargs)
+
+        conditional_view = condition(etag, modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            patch_page_cache_control(response, request.user, max_age)
+            return response
+        # По этим атрибутам страницу узнаёт кэш страниц.
+        wrapper.freshness = (scopes, max_age)
+        return wrapper
+    return decorator
+
+
+def index_scopes():
+    return [('index', None)]
+
+
+def group_scopes(slug):
+    group_ids = Group.objects.filter(slug=slug).values_list('pk', flat=True)
+    return [('group', pk) for pk in group_ids]
+
+
+def author_scopes(username):
+    user_ids = User.objects.filter(
+        username=username).values_list('pk', flat=True)
+    return [('author', pk) for pk in user_ids]
+
+
+def post_detail_scopes(post_id):
+    """Сам пост с комментариями, счётчики автора и название группы."""
+    scopes = []
+    posts = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id')
+    for author_id, group_id in posts:
+        scopes += [('post', post_id), ('author', author_id)]
+        if group_id:
+            scopes.append(('group', group_id))
+    return scopes
@@ -0,0 +1,280 @@
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, freshness, search, timeline
+from .api import loads
+from .models import Comment, Group, Post, User
+from .seeding import explicit_dates, reset_sequences
+
+
+class RecordError(ValueError):
+    pass
+
+
+# Поля, по которым повтор строки отличается от чужой записи с тем же id.
+IDENTITY = {
+    Post: ('author_id', 'pub_date', 'text'),
+    Comment: ('post_id', 'author_id', 'created', 'text'),
+}
+
+
+def _date(record, name):
+    value = parse_datetime(str(record.get(name, '')))
+    if value is None:
+        raise RecordError(f'нет даты {name}')
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def _id(record, name='id'):
+    value = record.get(name)
+    if not isinstance(value, int) or value <= 0:
+        raise RecordError(f'нет числового {name}')
+    return value
+
+
+def _kind(record):
+    """Строка выгрузки постов или комментариев из export_posts."""
+    kind = record.get('type') or ('comment' if 'post' in record else 'post')
+    if kind not in ('post', 'comment'):
+        raise RecordError(f'неизвестный type {kind}')
+    return kind
+
+
+class Importer:
+    """
+    Загрузка постов и комментариев из NDJSON.
+
+    Каждая строка - объект с id, author (username), text и pub_date для
+    поста, group (slug) и image (имя файла в хранилище) по желанию;
+    комментарий вместо pub_date несёт post (id поста) и created. Такой
+    формат выдаёт export_posts. Сами файлы картинок не копируются: их
+    переносят в MEDIA_ROOT отдельно, миниатюры досоздаёт
+    generate_thumbnails.
+    Исходные id сохраняются, поэтому уже загруженные строки при повторе
+    пропускаются. Строка, чей id занят другой записью, не загружается и
+    считается конфликтом. Авторы и группы ищутся по пачке сразу.
+
+    Пачка строк пишется одной транзакцией вместе со счётчиками, лентами
+    и поиском. После неё в файл состояния записывается смещение в
+    файле, и прерванный импорт продолжается со следующей пачки.
+    """
+
+    def __init__(self, path, state_path, batch_size=1000,
+                 create_missing=False, log=None):
+        self.path = os.path.abspath(path)
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.log = log or (lambda message: None)
+        self.user_ids = {}
+        self.group_ids = {}
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {'path': self.path, 'offset': 0, 'line': 0,
+                    'counts': {'posts': 0, 'comments': 0, 'skipped': 0,
+                               'conflicts': 0}}
+        with open(self.state_path) as file:
+            state = json.load(file)
+        if state['path'] != self.path:
+            raise ValueError(
+                f'{self.state_path} относится к {state["path"]}; '
+                f'удалите его или запустите с --restart.')
+        state['counts'].setdefault('conflicts', 0)
+        return state
+
+    def _save_state(self):
+        temporary = f'{self.state_path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.state, file, indent=2)
+        os.replace(temporary, self.state_path)
+
+    def _batches(self):
+        """Пачки (номер строки, запись) и смещение после пачки."""
+        with open(self.path, 'rb') as file:
+            file.seek(self.state['offset'])
+            number = self.state['line']
+            batch = []
+            for line in iter(file.readline, b''):
+                number += 1
+                if line.strip():
+                    batch.append((number, line))
+                if len(batch) == self.batch_size:
+                    yield batch, file.tell(), number
+                    batch = []
+            if batch:
+                yield batch, file.tell(), number
+
+    def _skip(self, number, reason):
+        self.state['counts']['skipped'] += 1
+        self.log(f'строка {number}: {reason}')
+
+    def _resolve(self, cache, model, field, values, build):
+        """id по username или slug; недостающие создаются по желанию."""
+        missing = set(values) - set(cache)
+        if missing and self.create_missing:
+            model.objects.bulk_create(
+                [build(value) for value in missing], ignore_conflicts=True)
+        if missing:
+            cache.update(model.objects.filter(
+                **{f'{field}__in': missing}).values_list(field, 'pk'))
+
+    def _users(self, usernames):
+        password = make_password(None)
+        self._resolve(self.user_ids, User, 'username', usernames,
+                      lambda name: User(username=name, password=password))
+
+    def _groups(self, slugs):
+        self._resolve(self.group_ids, Group, 'slug', slugs,
+                      lambda slug: Group(title=slug, slug=slug))
+
+    def _parse(self, batch):
+        records = []
+        for number, line in batch:
+            try:
+                record = loads(line)
+                if not isinstance(record, dict):
+                    raise RecordError('ожидался объект')
+                records.append((number, _kind(record), record))
+            except ValueError as error:
+                self._skip(number, error)
+        self._users({record['author'] for _, _, record in records
+                     if isinstance(record.get('author'), str)})
+        self._groups({record['group'] for _, kind, record in records
+                      if kind == 'post'
+                      and isinstance(record.get('group'), str)})
+        return records
+
+    def _author(self, record):
+        if not isinstance(record.get('author'), str):
+            raise RecordError('нет username автора')
+        author_id = self.user_ids.get(record['author'])
+        if author_id is None:
+            raise RecordError(f'нет пользователя {record.get("author")}')
+        return author_id
+
+    def _post(self, record):
+        group_id = None
+        if record.get('group'):
+            if not isinstance(record['group'], str):
+                raise RecordError('нет slug группы')
+            group_id = self.group_ids.get(record['group'])
+            if group_id is None:
+                raise RecordError(f'нет группы {record["group"]}')
+        pub_date = _date(record, 'pub_date')
+        image = record.get('image') or ''
+        if not isinstance(image, str):
+            raise RecordError('image должен быть именем файла')
+        return Post(
+            id=_id(record), author_id=self._author(record),
+            group_id=group_id, text=str(record.get('text', '')),
+            image=image, pub_date=pub_date,
+            updated=_date(record, 'updated') if record.get('updated')
+            else pub_date)
+
+    def _comment(self, record, post_ids):
+        post_id = _id(record, 'post')
+        if post_id not in post_ids:
+            raise RecordError(f'нет поста {post_id}')
+        return Comment(
+            id=_id(record), post_id=post_id, author_id=self._author(record),
+            text=str(record.get('text', '')),
+            created=_date(record, 'created'))
+
+    def _build(self, records):
+        posts, comments = [], []
+        post_refs = {record.get('post') for _, kind, record in records
+                     if kind == 'comment'}
+        post_ids = set(Post.objects.filter(
+            pk__in=[pk for pk in post_refs if isinstance(pk, int)]
+        ).values_list('pk', flat=True))
+        for number, kind, record in records:
+            try:
+                if kind == 'post':
+                    posts.append((number, self._post(record)))
+                    post_ids.add(posts[-1][1].pk)
+                else:
+                    comments.append(
+                        (number, self._comment(record, post_ids)))
+            except RecordError as error:
+                self._skip(number, error)
+        return self._new(Post, posts), self._new(Comment, comments)
+
+    def _new(self, model, numbered):
+        """
+        Без строк, уже загруженных прошлым запуском, и повторов id.
+        Занятый id с другими автором, датой или текстом - конфликт.
+        """
+        fields = IDENTITY[model]
+        seen = {
+            row[0]: row[1:] for row in model.objects.filter(
+                pk__in=[obj.pk for _, obj in numbered]
+            ).values_list('pk', *fields)
+        }
+        new = []
+        for number, obj in numbered:
+            identity = tuple(getattr(obj, field) for field in fields)
+            if obj.pk not in seen:
+                seen[obj.pk] = identity
+                new.append(obj)
+            elif seen[obj.pk] == identity:
+                self.state['counts']['skipped'] += 1
+            else:
+                self.state['counts']['conflicts'] += 1
+                self.log(f'строка {number}: id {obj.pk} занят другой записью')
+        return new
+
+    @staticmethod
+    def _derive(posts, comments):
+        """Счётчики, ленты, поиск и отметки свежести новых строк."""
+        counters.recount_users({post.author_id for post in posts})
+        counters.recount_posts({comment.post_id for comment in comments})
+        for post in posts:
+            timeline.fan_out(post)
+            search.index_post(post)
+        for comment in comments:
+            search.index_comment(comment)
+        scopes = {('index', None)}
+        for post in posts:
+            scopes.update(freshness.post_scopes(post))
+        scopes.update(('post', comment.post_id) for comment in comments)
+        transaction.on_commit(lambda: freshness.touch(*scopes))
+
+    def import_batch(self, batch):
+        with transaction.atomic():
+            posts, comments = self._build(self._parse(batch))
+            Post.objects.bulk_create(posts)
+            Comment.objects.bulk_create(comments)
+            self._derive(posts, comments)
+        self.state['counts']['posts'] += len(posts)
+        self.state['counts']['comments'] += len(comments)
+        return len(posts) + len(comments)
+
+    def run(self):
+        started = time.perf_counter()
+        lines = 0
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Post._meta.get_field('updated'),
+                            Comment._meta.get_field('created')):
+            for batch, offset, number in self._batches():
+                batch_started = time.perf_counter()
+                created = self.import_batch(batch)
+                self.state.update(offset=offset, line=number)
+                self._save_state()
+                lines += len(batch)
+                rate = len(batch) / (time.perf_counter() - batch_started)
+                self.log(f'строка {number}: записей {created}, '
+                         f'{rate:.0f} строк/с')
+        reset_sequences(Post, Comment)
+        elapsed = time.perf_counter() - started
+        return dict(self.state['counts'], lines=lines, seconds=elapsed,
+                    rate=lines / elapsed if elapsed else 0)
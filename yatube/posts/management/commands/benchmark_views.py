@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки, число SQL-запросов и память страниц постов '
+        'и сравнивает их с базовым прогоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help='Куда записать результаты JSON.')
+        parser.add_argument('--baseline', help='JSON базового прогона.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост времени и памяти, доля от базового.')
+
+    def handle(self, *args, **options):
+        try:
+            results = benchmark.run(options['repeat'])
+        except ValueError as error:
+            raise CommandError(error)
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<13} p50 {metrics["p50_ms"]:>8} мс  '
+                f'p95 {metrics["p95_ms"]:>8} мс  '
+                f'запросов {metrics["queries"]:>3}  '
+                f'память {metrics["peak_memory_kb"]} КБ'
+            )
+        if options['output']:
+            benchmark.save(results, options['output'])
+        if options['baseline']:
+            regressions = benchmark.compare(
+                results, benchmark.load(options['baseline']),
+                options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n'
+                    + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Замеры завершены'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk, export
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет отобранные посты с комментариями пачками по одному '
+        'DELETE, обновляя счётчики, ленты, поиск и кэши.'
+    )
+
+    def add_arguments(self, parser):
+        export.add_filter_arguments(parser)
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE)
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false',
+            dest='interactive', help='Не спрашивать подтверждения.')
+
+    def handle(self, *args, interactive, **options):
+        queryset = export.filtered(
+            'posts', author=options['author'], group=options['group'],
+            since=options['since'], until=options['until'])
+        if interactive:
+            answer = input(
+                f'Будет удалено постов: {queryset.count()}. '
+                f'Введите "yes", чтобы продолжить: ')
+            if answer != 'yes':
+                raise CommandError('Удаление отменено.')
+        result = bulk.delete_posts(queryset, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено постов: {result["posts"]}, комментариев: '
+            f'{result["comments"]} за {result["seconds"]:.2f} с'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в NDJSON или CSV '
+        'потоком, не загружая таблицу в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kind', nargs='?', default='posts', choices=export.EXPORTS)
+        parser.add_argument(
+            '--format', dest='output_format', default='ndjson',
+            choices=export.FORMATS)
+        parser.add_argument(
+            '--output', help='Файл выгрузки; по умолчанию stdout.')
+        export.add_filter_arguments(parser)
+        parser.add_argument(
+            '--batch-size', type=int, default=export.BATCH_SIZE)
+
+    def handle(self, *args, kind, output_format, output=None, **options):
+        try:
+            queryset = export.filtered(
+                kind, author=options['author'], group=options['group'],
+                since=options['since'], until=options['until'])
+        except ValueError as error:
+            raise CommandError(error)
+        chunks = export.stream(
+            kind, queryset, output_format, options['batch_size'])
+        if output is None:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+        written = 0
+        with open(output, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+                written += 1
+        # Каждый кусок - одна строка выгрузки, в CSV первая - заголовок.
+        if output_format == 'csv':
+            written -= 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {written} в {output}'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = 'Генерирует миниатюры картинок постов, у которых их ещё нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перегенерировать миниатюры всех постов с картинками.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnails_ready=False)
+        generated = 0
+        for post_id, image_name in posts.values_list(
+                'pk', 'image').iterator():
+            try:
+                generate(post_id, image_name)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Пост {post_id}: {error}')
+                continue
+            generated += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры созданы для постов: {generated}'))
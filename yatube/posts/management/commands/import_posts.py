@@ -0,0 +1,54 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importing import Importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты и комментарии из NDJSON пачками bulk_create с '
+        'исходными id и датами; прерванный импорт продолжается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Строк в одной транзакции.')
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать отсутствующих авторов и группы.')
+        parser.add_argument(
+            '--state',
+            help='Файл с прогрессом; по умолчанию <path>.state.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Забыть сохранённый прогресс и начать заново.')
+        parser.add_argument(
+            '--quiet', action='store_true',
+            help='Не печатать ход импорта по пачкам.')
+
+    def handle(self, *args, path, **options):
+        state = options['state'] or f'{path}.state'
+        if options['restart'] and os.path.exists(state):
+            os.remove(state)
+        try:
+            importer = Importer(
+                path, state,
+                batch_size=options['batch_size'],
+                create_missing=options['create_missing'],
+                log=None if options['quiet'] else self.stdout.write,
+            )
+            result = importer.run()
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов: {result["posts"]}, комментариев: '
+            f'{result["comments"]}, пропущено: {result["skipped"]}; '
+            f'{result["lines"]} строк за {result["seconds"]:.1f} с '
+            f'({result["rate"]:.0f} строк/с)'))
+        if result['conflicts']:
+            raise CommandError(
+                f'Не загружено строк: {result["conflicts"]} - их id '
+                f'заняты другими записями.')
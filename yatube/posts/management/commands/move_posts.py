@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk, export
+from posts.models import Group
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит отобранные посты в другую группу пачками по одному '
+        'UPDATE, обновляя кэши страниц и карточек.'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--to', help='slug группы назначения.')
+        target.add_argument(
+            '--no-group', action='store_true', help='Убрать группу.')
+        export.add_filter_arguments(parser)
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE)
+
+    def handle(self, *args, to=None, **options):
+        group = None
+        if to is not None:
+            group = Group.objects.filter(slug=to).first()
+            if group is None:
+                raise CommandError(f'Группы {to} нет.')
+        queryset = export.filtered(
+            'posts', author=options['author'], group=options['group'],
+            since=options['since'], until=options['until'])
+        result = bulk.move_posts(queryset, group, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено постов: {result["posts"]} '
+            f'за {result["seconds"]:.2f} с'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс по постам и комментариям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        indexed = rebuild(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано записей: {indexed}'))
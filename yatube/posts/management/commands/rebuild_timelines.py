@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='user_ids', type=int, action='append',
+            help='id пользователя, чью ленту нужно пересобрать; '
+                 'можно указать несколько раз.',
+        )
+
+    def handle(self, *args, user_ids=None, **options):
+        processed = rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Лент пересобрано по подпискам: {processed}'))
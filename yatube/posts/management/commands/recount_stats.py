@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_posts, recount_users
+from posts.models import Post, User
+
+
+def batches(queryset, batch_size):
+    """Возвращает id записей пачками по возрастанию первичного ключа."""
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        users = sum(
+            recount_users(ids) for ids in batches(User.objects, batch_size))
+        posts = sum(
+            recount_posts(ids) for ids in batches(Post.objects, batch_size))
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {users}, постов: {posts}'))
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import DEFAULTS, Seeder
+
+HELP = {
+    'users': 'Пользователей.',
+    'groups': 'Групп.',
+    'posts': 'Постов.',
+    'comments': 'Комментариев.',
+    'follows': 'Подписок; повторяющиеся пары пропускаются.',
+    'posts_alpha': 'Показатель степенного закона постов на автора.',
+    'followers_alpha': 'Показатель степенного закона подписчиков.',
+    'comments_alpha': 'Показатель степенного закона комментариев к посту.',
+    'days': 'За сколько последних дней разбросаны даты.',
+    'random_seed': 'Зерно генератора; одно зерно даёт одни данные.',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных проверок.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULTS.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=type(default),
+                default=default, help=f'{HELP[name]} По умолчанию {default}.')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Процессов для генерации строк.')
+        parser.add_argument(
+            '--state', default='seed_yatube.json',
+            help='Файл с прогрессом для продолжения прерванного запуска.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Забыть сохранённый прогресс и начать заново.')
+
+    def handle(self, *args, **options):
+        if options['restart'] and os.path.exists(options['state']):
+            os.remove(options['state'])
+        try:
+            seeder = Seeder(
+                {name: options[name] for name in DEFAULTS},
+                options['state'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                log=self.stdout.write,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        seeder.run()
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы'))
@@ -6,6 +6,11 @@ from django.db import models
 User = get_user_model()
 
 
+def thumbnail_name(image_name, size):
+    """Путь к миниатюре однозначно выводится из имени картинки."""
+    return f'thumbnails/{size}/{image_name}.jpg'
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -18,6 +23,7 @@ class Group(models.Model):
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,12 +45,65 @@ class Post(models.Model):
         blank=True
 
     )
+    fanned_out = models.BooleanField(
+        'Разослан по лентам подписчиков',
+        default=True,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+    )
+    thumbnails_ready = models.BooleanField(
+        'Миниатюры готовы',
+        default=False,
+    )
 
     def __str__(self):
         return self.text[:settings.CONST_STR]
 
+    def thumbnail_url(self, size):
+        """Пока миниатюры не готовы, отдаётся исходная картинка."""
+        if not self.image:
+            return ''
+        if not self.thumbnails_ready:
+            return self.image.url
+        return self.image.storage.url(thumbnail_name(self.image.name, size))
+
+    @property
+    def card_image_url(self):
+        return self.thumbnail_url('card')
+
+    @property
+    def detail_image_url(self):
+        return self.thumbnail_url('detail')
+
+    @property
+    def retina_image_url(self):
+        return self.thumbnail_url('retina')
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            # Отметка свежести на промахе кэша - MAX(updated) области.
+            models.Index(fields=['updated'], name='post_updated_idx'),
+            models.Index(
+                fields=['group', 'updated'], name='post_group_updated_idx'
+            ),
+            models.Index(
+                fields=['author', 'updated'], name='post_author_updated_idx'
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -61,6 +120,14 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     text = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -69,3 +136,69 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="following"
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries'
+    )
+    # Копия Post.pub_date: страница ленты читается по индексу записей
+    # без сортировки всей ленты пользователя.
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+
+class SearchTerm(models.Model):
+    """Строка инвертированного индекса поиска для баз без FTS5."""
+    TERM_LENGTH = 64
+
+    term = models.CharField(max_length=TERM_LENGTH)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='search_terms'
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='search_terms'
+    )
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_idx'),
+        ]
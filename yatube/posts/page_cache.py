@@ -0,0 +1,193 @@
+import re
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import freshness
+from .models import Follow
+
+PAGE_KEY = 'page:{}:{}'
+# Параметры адреса, от которых зависит страница ленты; fields - выбор
+# полей в API.
+PAGE_PARAMS = ('cursor', 'page', 'fields')
+SAFE_METHODS = ('GET', 'HEAD')
+HOLE = re.compile(r'<!--hole:(\d+)-->(.*?)<!--/hole-->', re.S)
+# Заголовки ответа, которые не переносятся в кэш.
+SKIPPED_HEADERS = ('Content-Length', 'Server-Timing')
+
+
+def _following(request, username):
+    following = (request.user.is_authenticated
+                 and Follow.objects.filter(
+                     user=request.user,
+                     author__username=username).exists())
+    return {'following': following}
+
+
+# Дырки в странице: шаблон и функция, которая досчитывает его контекст
+# для конкретного пользователя.
+HOLES = {
+    'header': ('includes/header.html', None),
+    'switcher': ('includes/switcher.html', None),
+    'follow_button': ('includes/follow_button.html', _following),
+}
+
+
+def page_key(request, stamp):
+    """
+    Ключ страницы: путь, курсор и отметка свежести её областей. Любое
+    изменение постов области сдвигает отметку, и старая копия больше
+    не находится - отдельная чистка кэша не нужна.
+    """
+    params = '&'.join(
+        f'{name}={request.GET.get(name, "")}' for name in PAGE_PARAMS)
+    digest = md5(f'{request.path}?{params}'.encode()).hexdigest()
+    return PAGE_KEY.format(digest, stamp.timestamp())
+
+
+def _cacheable(request):
+    return (settings.PAGE_CACHE_SECONDS
+            and request.method in SAFE_METHODS
+            and set(request.GET) <= set(PAGE_PARAMS))
+
+
+def render_hole(request, name, params):
+    template, extra = HOLES[name]
+    context = dict(params)
+    if extra is not None:
+        context.update(extra(request, **params))
+    return render_to_string(template, context, request=request)
+
+
+def _content(entry, request=None):
+    """
+    Страница из частей: между статичными кусками стоят дырки. Гостю
+    достаются дырки в том виде, в каком были сохранены, пользователю
+    они отрисовываются заново.
+    """
+    parts = []
+    for number, chunk in enumerate(entry['chunks']):
+        kind = number % 3
+        if kind == 0:
+            parts.append(chunk)
+        elif kind == 2 and request is None:
+            parts.append(chunk)
+        elif kind == 2:
+            name, params = entry['holes'][int(entry['chunks'][number - 1])]
+            parts.append(render_hole(request, name, params))
+    return ''.join(parts)
+
+
+def _response(entry):
+    response = HttpResponse(_content(entry))
+    for header, value in entry['headers'].items():
+        response[header] = value
+    return response
+
+
+def cached_page(view):
+    """
+    Отдаёт страницу из кэша страниц, заполняя дырки под пользователя.
+
+    Ставится под conditional_page: ключ строится по уже посчитанной
+    отметке свежести. Заголовки кэширования пользователю выставит
+    conditional_page, поэтому сохранённые гостевые не переносятся.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        stamp = getattr(request, 'freshness_stamp', None)
+        entry = None
+        if stamp is not None and _cacheable(request):
+            entry = cache.get(page_key(request, stamp))
+        if entry is None:
+            return view(request, *args, **kwargs)
+        if not request.user.is_authenticated:
+            return _response(entry)
+        return HttpResponse(
+            _content(entry, request),
+            content_type=entry['headers'].get('Content-Type'))
+    wrapper.page_cache = True
+    return wrapper
+
+
+class PageCacheMiddleware:
+    """
+    Кэш целых страниц для гостей.
+
+    Запрос без сессионной куки к странице с cached_page отдаётся из
+    кэша раньше сессий, аутентификации и CSRF; промах проходит обычный
+    путь, и готовая страница сохраняется вместе с разметкой дырок.
+    Ставится сразу после SecurityMiddleware; выключается
+    PAGE_CACHE_SECONDS = 0.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        page = self._page(request)
+        if page is None:
+            return self.get_response(request)
+        match, (scopes, max_age) = page
+        stamp = freshness.request_stamp(
+            request, scopes, match.args, match.kwargs)
+        key = page_key(request, stamp)
+        entry = cache.get(key)
+        if entry is not None:
+            return self._hit(request, entry, stamp, max_age)
+        request.page_holes = []
+        response = self.get_response(request)
+        if response.status_code != 200 or response.streaming:
+            return response
+        content = response.content.decode(response.charset)
+        if not response.cookies:
+            self._store(key, request, response, content)
+        if request.page_holes:
+            response.content = HOLE.sub(r'\2', content)
+        return response
+
+    @staticmethod
+    def _page(request):
+        if (not _cacheable(request)
+                or settings.SESSION_COOKIE_NAME in request.COOKIES):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if not getattr(match.func, 'page_cache', False):
+            return None
+        return match, match.func.freshness
+
+    @staticmethod
+    def _hit(request, entry, stamp, max_age):
+        user = AnonymousUser()
+        etag = f'"{freshness.page_etag(stamp, user)}"'
+        modified = int(stamp.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified,
+            response=_response(entry))
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        freshness.patch_page_cache_control(response, user, max_age)
+        return response
+
+    @staticmethod
+    def _store(key, request, response, content):
+        cache.set(key, {
+            # Без дырок страница не размечена, и искать в ней разметку,
+            # например в тексте поста внутри JSON, нельзя.
+            'chunks': (HOLE.split(content) if request.page_holes
+                       else [content]),
+            'holes': request.page_holes,
+            'headers': {header: value for header, value in response.items()
+                        if header not in SKIPPED_HEADERS},
+        }, settings.PAGE_CACHE_SECONDS)
@@ -0,0 +1,248 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = 'posts_search'
+POST_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+WORD = re.compile(r'\w+')
+
+# Стеммер Портера для русского языка.
+VOWELS = 'аеиоуыэюя'
+RVRE = re.compile(f'^(.*?[{VOWELS}])(.*)$')
+PERFECTIVE_GROUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|((?<=[ая])(ла|на|ете|йте|ли|й|'
+    r'л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|'
+    r'ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+DERIVATIONAL = re.compile(f'.*[^{VOWELS}]+[{VOWELS}].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def _strip_ending(rv):
+    stripped = PERFECTIVE_GROUND.sub('', rv, 1)
+    if stripped != rv:
+        return stripped
+    rv = REFLEXIVE.sub('', rv, 1)
+    stripped = ADJECTIVE.sub('', rv, 1)
+    if stripped != rv:
+        return PARTICIPLE.sub('', stripped, 1)
+    stripped = VERB.sub('', rv, 1)
+    if stripped != rv:
+        return stripped
+    return NOUN.sub('', rv, 1)
+
+
+@lru_cache(maxsize=10000)
+def stem(word):
+    """Основа русского слова; остальные слова только приводятся к нижнему
+    регистру."""
+    word = word.lower().replace('ё', 'е')
+    match = RVRE.match(word)
+    if not match:
+        return word
+    head, rv = match.groups()
+    rv = _strip_ending(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_ENDING.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return head + rv
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD.findall(text)]
+
+
+class FtsIndex:
+    """Индекс на SQLite FTS5 поверх заранее выделенных основ слов."""
+
+    @staticmethod
+    def _rowid(obj):
+        # Посты и комментарии делят одну таблицу: чётные rowid у постов.
+        if isinstance(obj, Post):
+            return obj.pk * 2
+        return obj.pk * 2 + 1
+
+    def index(self, obj, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, body, post_id) '
+                f'VALUES (%s, %s, %s)',
+                [self._rowid(obj), ' '.join(tokenize(obj.text)), post_id]
+            )
+
+    def remove(self, obj):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [self._rowid(obj)]
+            )
+
+    def remove_posts(self, post_ids):
+        # Удаление по rowid идёт по ключу, а условие на post_id
+        # перебирало бы всю таблицу FTS.
+        comment_ids = Comment.objects.filter(
+            post_id__in=post_ids).values_list('pk', flat=True)
+        rowids = [pk * 2 for pk in post_ids]
+        rowids.extend(pk * 2 + 1 for pk in comment_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [[rowid] for rowid in rowids]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, terms, limit):
+        match = ' '.join(f'"{term}"' for term in terms)
+        with connection.cursor() as cursor:
+            # Внутренний LIMIT не даёт SQLite развернуть подзапрос:
+            # bm25() нельзя вызывать внутри агрегата.
+            cursor.execute(
+                f'SELECT post_id, SUM(score) AS total FROM ('
+                f'  SELECT post_id, bm25({FTS_TABLE}) * '
+                f'    (CASE rowid %% 2 WHEN 0 THEN {POST_WEIGHT} '
+                f'     ELSE {COMMENT_WEIGHT} END) AS score'
+                f'  FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+                f'  ORDER BY rank LIMIT %s'
+                f') GROUP BY post_id ORDER BY total, post_id DESC LIMIT %s',
+                [match, settings.SEARCH_MAX_ROWS, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TermIndex:
+    """Инвертированный индекс в обычной таблице SearchTerm."""
+
+    @staticmethod
+    def _terms(obj):
+        if isinstance(obj, Post):
+            return SearchTerm.objects.filter(post=obj, comment=None)
+        return SearchTerm.objects.filter(comment=obj)
+
+    def index(self, obj, post_id):
+        self.remove(obj)
+        weight = POST_WEIGHT if isinstance(obj, Post) else COMMENT_WEIGHT
+        comment_id = None if isinstance(obj, Post) else obj.pk
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term[:SearchTerm.TERM_LENGTH], post_id=post_id,
+                       comment_id=comment_id, weight=count * weight)
+            for term, count in Counter(tokenize(obj.text)).items()
+        )
+
+    def remove(self, obj):
+        self._terms(obj).delete()
+
+    def remove_posts(self, post_ids):
+        # Строки комментариев тоже несут post_id. У SearchTerm нет ни
+        # зависимых строк, ни сигналов, так что Collector не нужен.
+        terms = SearchTerm.objects.filter(post_id__in=post_ids)
+        terms._raw_delete(terms.db)
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, terms, limit):
+        terms = {term[:SearchTerm.TERM_LENGTH] for term in terms}
+        # Как в FTS: все слова должны встретиться в одном тексте - посте
+        # или одном комментарии, и очки его текстов складываются.
+        documents = (
+            SearchTerm.objects.filter(term__in=terms)
+            .values('post', 'comment')
+            .annotate(matched=Count('term', distinct=True),
+                      score=Sum('weight'))
+            .filter(matched=len(terms))
+            .order_by('-score')
+            .values_list('post', 'score')[:settings.SEARCH_MAX_ROWS]
+        )
+        scores = Counter()
+        for post_id, score in documents:
+            scores[post_id] += score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [post_id for post_id, _ in ranked[:limit]]
+
+
+@lru_cache(maxsize=None)
+def fts5_available():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def get_index():
+    backend = settings.SEARCH_BACKEND
+    if backend == 'fts' or backend == 'auto' and fts5_available():
+        return FtsIndex()
+    return TermIndex()
+
+
+def index_post(post):
+    get_index().index(post, post.pk)
+
+
+def index_comment(comment):
+    get_index().index(comment, comment.post_id)
+
+
+def remove(obj):
+    get_index().remove(obj)
+
+
+def remove_posts(post_ids):
+    """Убирает из индекса посты вместе с их комментариями."""
+    get_index().remove_posts(post_ids)
+
+
+def search_posts(query, limit=None):
+    """
+    id постов, подходящих под запрос, от более релевантных к менее. Все
+    слова запроса должны найтись в одном тексте: в посте или в одном
+    из его комментариев.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    return get_index().search(terms, limit or settings.SEARCH_MAX_RESULTS)
+
+
+def rebuild(batch_size=1000):
+    """Переиндексирует все посты и комментарии. Возвращает их число."""
+    search_index = get_index()
+    search_index.clear()
+    indexed = 0
+    for post in Post.objects.only('text').iterator(chunk_size=batch_size):
+        search_index.index(post, post.pk)
+        indexed += 1
+    for comment in Comment.objects.only('text', 'post_id').iterator(
+            chunk_size=batch_size):
+        search_index.index(comment, comment.post_id)
+        indexed += 1
+    return indexed
@@ -0,0 +1,295 @@
+import json
+import os
+import random
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from itertools import accumulate
+from multiprocessing import Pool
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+from .models import Comment, Follow, Group, Post, User
+
+USER_PREFIX = 'seed_'
+GROUP_PREFIX = 'seed-'
+TEXT_POOL_SIZE = 1000
+PHASES = ('users', 'groups', 'posts', 'comments', 'follows')
+# Фазы, строкам которых id назначаются заранее: у остальных повтор
+# пачки отсекают уникальные username, slug и пары подписок.
+NUMBERED_PHASES = ('posts', 'comments')
+
+DEFAULTS = {
+    'users': 100_000,
+    'groups': 1_000,
+    'posts': 1_000_000,
+    'comments': 1_000_000,
+    'follows': 10_000_000,
+    'posts_alpha': 1.1,
+    'followers_alpha': 1.2,
+    'comments_alpha': 1.0,
+    'days': 365,
+    'random_seed': 0,
+}
+
+
+class PowerLaw:
+    """Случайный ранг от 0 до size - 1 с весом 1 / (ранг + 1) ** alpha."""
+
+    def __init__(self, size, alpha):
+        self.cumulative = list(
+            accumulate(1 / (rank + 1) ** alpha for rank in range(size)))
+
+    def sample(self, rnd):
+        return bisect(self.cumulative, rnd.random() * self.cumulative[-1])
+
+
+_worker = {}
+
+
+def _init_worker(options):
+    _worker['options'] = options
+    _worker['authors'] = PowerLaw(options['users'], options['posts_alpha'])
+    _worker['followed'] = PowerLaw(
+        options['users'], options['followers_alpha'])
+    _worker['commented'] = PowerLaw(
+        options['posts'], options['comments_alpha'])
+
+
+def _generate(task):
+    """
+    Строки одной пачки в виде кортежей рангов и смещений. Пачка
+    зависит только от параметров и своего номера, поэтому после
+    перезапуска генерируется заново такой же. Вместе со строками
+    возвращается номер первой из них в фазе.
+    """
+    return task[2], _rows(*task)
+
+
+def _rows(phase, number, start, size):
+    options = _worker['options']
+    rnd = random.Random(f'{options["random_seed"]}-{phase}-{number}')
+    seconds = options['days'] * 24 * 3600
+    if phase in ('users', 'groups'):
+        return [(index, rnd.randrange(TEXT_POOL_SIZE))
+                for index in range(start, start + size)]
+    if phase == 'posts':
+        return [(_worker['authors'].sample(rnd),
+                 rnd.randrange(options['groups'])
+                 if options['groups'] and rnd.random() < 0.5 else None,
+                 rnd.randrange(TEXT_POOL_SIZE), rnd.randrange(seconds))
+                for _ in range(size)]
+    if phase == 'comments':
+        return [(_worker['commented'].sample(rnd),
+                 rnd.randrange(options['users']),
+                 rnd.randrange(TEXT_POOL_SIZE), rnd.randrange(seconds))
+                for _ in range(size)]
+    pairs = {(rnd.randrange(options['users']),
+              _worker['followed'].sample(rnd)) for _ in range(size)}
+    return [(user, author) for user, author in pairs if user != author]
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    Позволяет bulk_create записать свои даты в поля с auto_now и
+    auto_now_add.
+    """
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def reset_sequences(*models):
+    """
+    Сдвигает счётчики id в PostgreSQL за строки, записанные со своими
+    id; в SQLite запросов не будет.
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Seeder:
+    """
+    Генератор синтетических данных для нагрузочных проверок.
+
+    Строки считаются в пуле процессов, а в базу пишутся пачками
+    bulk_create из основного процесса: SQLite не любит параллельных
+    писателей. Номер последней записанной пачки каждой фазы хранится в
+    файле состояния, так что прерванный запуск продолжается с места
+    остановки. Файл пишется уже после транзакции пачки, поэтому посты
+    и комментарии получают id, заданные номером строки: пачку,
+    записанную перед сбоем, повтор пропускает, а не дублирует.
+    """
+
+    def __init__(self, options, state_path, batch_size=10_000, workers=1,
+                 log=None):
+        self.options = options
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.workers = workers
+        self.log = log or (lambda message: None)
+        self.state = self._load_state()
+        self.now = timezone.now()
+        self.password = make_password(None)
+        self.texts = [mixer.faker.text() for _ in range(TEXT_POOL_SIZE)]
+        self.titles = [mixer.faker.sentence(nb_words=3)[:200]
+                       for _ in range(TEXT_POOL_SIZE)]
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {'options': self.options, 'done': {}, 'first_ids': {},
+                    'derived': False}
+        with open(self.state_path) as file:
+            state = json.load(file)
+        if state['options'] != self.options:
+            raise ValueError(
+                f'{self.state_path} создан с другими параметрами; '
+                f'удалите его или запустите с --restart.')
+        return state
+
+    def _save_state(self):
+        temporary = f'{self.state_path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.state, file, indent=2)
+        os.replace(temporary, self.state_path)
+
+    def _tasks(self, phase):
+        total = self.options[phase]
+        done = self.state['done'].get(phase, 0)
+        for number, start in enumerate(range(0, total, self.batch_size)):
+            if number >= done:
+                yield phase, number, start, min(self.batch_size, total - start)
+
+    def _chunks(self, phase):
+        tasks = self._tasks(phase)
+        if self.workers <= 1:
+            _init_worker(self.options)
+            yield from map(_generate, tasks)
+            return
+        with Pool(self.workers, _init_worker, (self.options,)) as pool:
+            yield from pool.imap(_generate, tasks)
+
+    @staticmethod
+    def _ids(model, **filters):
+        return list(model.objects.filter(**filters).order_by('pk')
+                    .values_list('pk', flat=True))
+
+    def _ago(self, seconds):
+        return self.now - timedelta(seconds=seconds)
+
+    def _build_users(self, rows):
+        return [User(username=f'{USER_PREFIX}{index}', password=self.password)
+                for index, _ in rows]
+
+    def _build_groups(self, rows):
+        return [Group(title=self.titles[text], slug=f'{GROUP_PREFIX}{index}',
+                      description=self.texts[text])
+                for index, text in rows]
+
+    @staticmethod
+    def _pick(ids, rank):
+        # Ранги считаются от заданных объёмов; если записей оказалось
+        # меньше, например после ручной чистки, они идут по кругу.
+        return ids[rank % len(ids)]
+
+    def _post(self, author, group, text, seconds):
+        # Поста не правили: изменён тогда же, когда опубликован.
+        pub_date = self._ago(seconds)
+        return Post(author_id=self._pick(self.user_ids, author),
+                    group_id=None if group is None
+                    else self._pick(self.group_ids, group),
+                    text=self.texts[text], pub_date=pub_date,
+                    updated=pub_date)
+
+    def _build_posts(self, rows):
+        return [self._post(*row) for row in rows]
+
+    def _build_comments(self, rows):
+        return [Comment(post_id=self._pick(self.post_ids, post),
+                        author_id=self._pick(self.user_ids, author),
+                        text=self.texts[text], created=self._ago(seconds))
+                for post, author, text, seconds in rows]
+
+    def _build_follows(self, rows):
+        return [Follow(user_id=self._pick(self.user_ids, user),
+                       author_id=self._pick(self.user_ids, author))
+                for user, author in rows]
+
+    def _prepare(self, phase):
+        if phase in ('posts', 'comments', 'follows'):
+            self.user_ids = self._ids(
+                User, username__startswith=USER_PREFIX)
+        if phase == 'posts':
+            self.group_ids = self._ids(Group, slug__startswith=GROUP_PREFIX)
+        if phase == 'comments':
+            self.post_ids = self._ids(
+                Post, author__username__startswith=USER_PREFIX)
+
+    def _first_id(self, phase, model):
+        """
+        Первый id строк фазы: запоминается до первой пачки и после
+        перезапуска не меняется. Таблицу в это время никто другой не
+        пополняет - сидер запускают на отдельной базе.
+        """
+        first_ids = self.state.setdefault('first_ids', {})
+        if phase not in first_ids:
+            last = model.objects.order_by('-pk').values_list(
+                'pk', flat=True).first()
+            first_ids[phase] = (last or 0) + 1
+            self._save_state()
+        return first_ids[phase]
+
+    def run_phase(self, phase):
+        if not self.options[phase]:
+            return
+        self._prepare(phase)
+        model = {'users': User, 'groups': Group, 'posts': Post,
+                 'comments': Comment, 'follows': Follow}[phase]
+        build = getattr(self, f'_build_{phase}')
+        first_id = None
+        if phase in NUMBERED_PHASES:
+            first_id = self._first_id(phase, model)
+        for start, rows in self._chunks(phase):
+            objects = build(rows)
+            if first_id is not None:
+                for offset, obj in enumerate(objects):
+                    obj.pk = first_id + start + offset
+            with transaction.atomic():
+                model.objects.bulk_create(objects, ignore_conflicts=True)
+            self.state['done'][phase] = self.state['done'].get(phase, 0) + 1
+            self._save_state()
+            self.log(f'{phase}: пачка {self.state["done"][phase]}')
+
+    def rebuild_derived(self):
+        """Счётчики, ленты и поиск, которые bulk_create не обновил."""
+        if self.state['derived']:
+            return
+        for command in ('recount_stats', 'rebuild_timelines',
+                        'rebuild_search_index'):
+            call_command(command, stdout=StringIO())
+            self.log(f'{command}: готово')
+        self.state['derived'] = True
+        self._save_state()
+
+    def run(self):
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Post._meta.get_field('updated'),
+                            Comment._meta.get_field('created')):
+            for phase in PHASES:
+                self.run_phase(phase)
+        reset_sequences(Post, Comment)
+        self.rebuild_derived()
@@ -0,0 +1,187 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    author_cards, card_cache, changelist, counters, freshness, search,
+    thumbnails, timeline,
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def drop_from_timeline(sender, instance, **kwargs):
+    timeline.drop(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+
+
+# Версии карточек меняются только после записи транзакции: иначе
+# читатель успел бы закэшировать старую строку под новой версией.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_card(sender, instance, **kwargs):
+    transaction.on_commit(partial(card_cache.bump, 'post', instance.pk))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_cards(sender, instance, **kwargs):
+    transaction.on_commit(partial(card_cache.bump, 'group', instance.pk))
+
+
+@receiver(post_save, sender=User)
+def bump_author_cards(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(partial(card_cache.bump, 'author', instance.pk))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_author_card(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(partial(author_cards.forget, instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        search.index_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def remove_from_search(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, **kwargs):
+    if instance.pk and not kwargs.get('raw'):
+        instance._old_group_id, instance._old_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image').first() or (None, ''))
+
+
+@receiver(post_save, sender=Post)
+def remove_replaced_thumbnails(sender, instance, **kwargs):
+    old_image = getattr(instance, '_old_image', '')
+    if old_image and old_image != instance.image.name:
+        thumbnails.remove([old_image])
+
+
+@receiver(post_delete, sender=Post)
+def remove_deleted_thumbnails(sender, instance, **kwargs):
+    thumbnails.remove([instance.image.name])
+
+
+def _touch_after_commit(scopes):
+    # Новая отметка до записи транзакции досталась бы странице со
+    # старыми данными: её ETag и копия в кэше страниц жили бы дальше.
+    transaction.on_commit(partial(freshness.touch, *scopes))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_scopes(sender, instance, **kwargs):
+    scopes = freshness.post_scopes(instance)
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id and old_group_id != instance.group_id:
+        scopes.append(('group', old_group_id))
+    _touch_after_commit(scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment_scopes(sender, instance, **kwargs):
+    _touch_after_commit([('post', instance.post_id)])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_follow_scopes(sender, instance, **kwargs):
+    _touch_after_commit([('author', instance.author_id),
+                         ('author', instance.user_id)])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def touch_group_scope(sender, instance, **kwargs):
+    # При удалении посты ещё в группе: их авторы находятся.
+    _touch_after_commit(freshness.group_change_scopes(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def touch_author_scope(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    _touch_after_commit(freshness.author_change_scopes(instance.pk))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group_choices(sender, instance, **kwargs):
+    changelist.forget_group_choices()
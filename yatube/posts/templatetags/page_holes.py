@@ -0,0 +1,23 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.page_cache import HOLES
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """
+    Часть страницы, которая зависит от пользователя. Для кэша страниц
+    она размечается, чтобы при выдаче из кэша её можно было отрисовать
+    заново под вошедшего пользователя.
+    """
+    with context.push(**params):
+        html = context.template.engine.get_template(
+            HOLES[name][0]).render(context)
+    holes = getattr(context.get('request'), 'page_holes', None)
+    if holes is None:
+        return html
+    holes.append((name, params))
+    return mark_safe(f'<!--hole:{len(holes) - 1}-->{html}<!--/hole-->')
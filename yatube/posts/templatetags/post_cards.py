@@ -0,0 +1,10 @@
+from django import template
+
+from posts.card_cache import card_version as get_card_version
+
+register = template.Library()
+
+
+@register.filter
+def card_version(post):
+    return get_card_version(post)
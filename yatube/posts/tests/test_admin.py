@@ -0,0 +1,130 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from posts.changelist import estimated_count, group_choices
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+class PostChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        groups = [Group.objects.create(title=f'Группа {number}',
+                                       slug=f'group-{number}')
+                  for number in range(10)]
+        authors = [User.objects.create_user(username=f'author{number}')
+                   for number in range(10)]
+        Post.objects.bulk_create(
+            Post(author=authors[number % 10], group=groups[number % 10],
+                 text=f'Пост {number}')
+            for number in range(105))
+        cls.url = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Авторы, группы и варианты групп не читаются построчно."""
+        analyze()
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+        self.assertLess(len(sql), 15, '\n'.join(sql))
+        self.assertFalse([query for query in sql if 'COUNT(' in query])
+        self.assertFalse(
+            [query for query in sql if 'FROM "posts_group"' in query])
+
+    def test_keyset_pages(self):
+        """Страницы списка идут по курсору без повторов."""
+        first = self.client.get(self.url).context['cl']
+        self.assertIsNone(first.previous_url)
+        second = self.client.get(self.url + first.next_url).context['cl']
+        ids = {post.pk for post in first.result_list}
+        ids.update(post.pk for post in second.result_list)
+        self.assertEqual(len(second.result_list), 5)
+        self.assertEqual(len(ids), 105)
+        self.assertTrue(second.previous_url)
+        self.assertIsNone(second.next_url)
+
+    def test_sorted_changelist_falls_back_to_pages(self):
+        """Сортировка по колонке листается обычными страницами."""
+        response = self.client.get(self.url, {'o': '2'})
+        self.assertIsNone(response.context['cl'].page)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+
+    def test_sorted_pages_ignore_stale_statistics(self):
+        """Страницы сортированного списка считаются по точному COUNT."""
+        analyze()
+        Post.objects.bulk_create(
+            Post(author=self.admin, text='Новый пост') for _ in range(200))
+        cl = self.client.get(self.url, {'o': '2'}).context['cl']
+        self.assertEqual(cl.result_count, 305)
+        self.assertTrue(cl.multi_page)
+        self.assertEqual(len(cl.result_list), 100)
+
+    def test_estimated_count(self):
+        """Оценка берётся из статистики базы, без неё - COUNT."""
+        self.assertEqual(estimated_count(Post.objects.all()), (105, False))
+        analyze()
+        Post.objects.filter(text='Пост 1').delete()
+        self.assertEqual(estimated_count(Post.objects.all()), (105, True))
+        self.assertEqual(
+            estimated_count(Post.objects.filter(text='Пост 2')), (1, False))
+
+    def test_unanalyzed_table_shows_exact_count(self):
+        cl = self.client.get(self.url).context['cl']
+        self.assertEqual((cl.result_count, cl.count_is_estimated),
+                         (105, False))
+
+    def test_year_filter(self):
+        """Фильтр по году предлагает годы от первого поста до последнего."""
+        Post.objects.filter(pk=Post.objects.earliest('pk').pk).update(
+            pub_date=timezone.make_aware(datetime(2019, 5, 1)))
+        response = self.client.get(self.url, {'year': '2019'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        choices = [choice['display'] for choice in
+                   response.context['cl'].filter_specs[1].choices(
+                       response.context['cl'])]
+        self.assertIn('2019', choices)
+        self.assertIn(str(timezone.now().year), choices)
+
+    def test_group_choices_follow_group_changes(self):
+        """Кэш вариантов групп сбрасывается при изменении группы."""
+        group_choices('---')
+        Group.objects.create(title='Новая группа', slug='new')
+        self.assertIn('Новая группа',
+                      [title for _, title in group_choices('---')])
+
+    def test_list_editable_saves_group(self):
+        """Смена группы в списке по-прежнему сохраняется."""
+        post = Post.objects.latest('pub_date', 'pk')
+        group = Group.objects.get(slug='group-0')
+        cl = self.client.get(self.url).context['cl']
+        data = {
+            'form-TOTAL_FORMS': len(cl.result_list),
+            'form-INITIAL_FORMS': len(cl.result_list),
+            '_save': 'Сохранить',
+        }
+        for number, row in enumerate(cl.result_list):
+            data[f'form-{number}-id'] = row.pk
+            data[f'form-{number}-group'] = (
+                group.pk if row.pk == post.pk else row.group_id)
+        self.client.post(self.url, data)
+        self.assertEqual(Post.objects.get(pk=post.pk).group, group)
@@ -0,0 +1,109 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts import api
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {number}', group=cls.group)
+            for number in range(13))
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(f'posts:{name}', args=args),
+                                   params)
+        return response, json.loads(response.content)
+
+    def test_feeds_page_by_cursor(self):
+        """Ленты отдаются страницами по курсору без повторов."""
+        self.client.force_login(self.reader)
+        feeds = (('api_index',), ('api_group', 'test-slug'),
+                 ('api_profile', 'author'), ('api_follow',))
+        for name, *args in feeds:
+            with self.subTest(feed=name):
+                response, first = self.get(name, *args)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json')
+                _, second = self.get(
+                    name, *args, cursor=first['next_cursor'])
+                ids = [row['id'] for row in first['results']
+                       + second['results']]
+                self.assertEqual(len(ids), 13)
+                self.assertEqual(len(set(ids)), 13)
+                self.assertIsNone(second['next_cursor'])
+
+    def test_default_fields(self):
+        """По умолчанию пост отдаётся с автором и группой."""
+        _, data = self.get('api_index')
+        row = data['results'][0]
+        self.assertEqual(set(row), set(api.DEFAULT_FIELDS))
+        self.assertEqual(row['author'], 'author')
+        self.assertEqual(row['group'], 'test-slug')
+        self.assertIsNone(row['image'])
+
+    def test_field_selection(self):
+        """?fields= оставляет только выбранные поля и колонки."""
+        with self.assertNumQueries(2):
+            _, data = self.get('api_index', fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+
+    def test_unknown_field_is_rejected(self):
+        """Неизвестное поле - ошибка 400 со списком доступных."""
+        response, data = self.get('api_index', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', data['error'])
+
+    def test_post_detail(self):
+        """Один пост и 404 для несуществующего."""
+        post = Post.objects.latest('pk')
+        _, data = self.get('api_post', post.pk, fields='id,comments_count')
+        self.assertEqual(data, {'id': post.pk, 'comments_count': 0})
+        response, _ = self.get('api_post', post.pk + 100)
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_group_and_guest_follow(self):
+        """Нет группы - 404, лента подписок гостю - 401."""
+        self.assertEqual(
+            self.get('api_group', 'missing')[0].status_code, 404)
+        self.assertEqual(self.get('api_follow')[0].status_code, 401)
+
+    def test_stdlib_serializer_matches(self):
+        """Без orjson ответ собирается стандартным json."""
+        post = Post.objects.latest('pk')
+        data = {'pub_date': post.pub_date, 'text': 'Пост'}
+        orjson, api.orjson = api.orjson, None
+        try:
+            fallback = json.loads(api.dumps(data))
+        finally:
+            api.orjson = orjson
+        self.assertEqual(fallback, json.loads(api.dumps(data)))
+
+    @override_settings(PAGE_CACHE_SECONDS=60)
+    def test_guest_pages_are_cached(self):
+        """Гостевая страница ленты берётся из кэша страниц."""
+        url = reverse('posts:api_index')
+        first = self.client.get(url, {'fields': 'id'})
+        with self.assertNumQueries(0):
+            second = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertIn('public', second['Cache-Control'])
+        self.client.force_login(self.reader)
+        third = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(third.content, first.content)
+        self.assertEqual(third['Content-Type'], 'application/json')
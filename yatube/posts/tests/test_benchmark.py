@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts import benchmark
+from posts.seeding import DEFAULTS, Seeder
+
+SMALL = dict(DEFAULTS, users=20, groups=3, posts=60, comments=30,
+             follows=50)
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with tempfile.TemporaryDirectory() as directory:
+            Seeder(SMALL, os.path.join(directory, 'state.json'),
+                   batch_size=25).run()
+
+    def test_run_measures_every_view(self):
+        """Замеряется каждая страница, все отвечают 200."""
+        results = benchmark.run(repeat=3)
+        self.assertEqual(
+            set(results),
+            {'index', 'group_posts', 'profile', 'post_detail',
+             'follow_index'})
+        for name, metrics in results.items():
+            with self.subTest(view=name):
+                self.assertEqual(metrics['status'], 200)
+                self.assertGreater(metrics['queries'], 0)
+                self.assertLessEqual(metrics['p50_ms'], metrics['p95_ms'])
+
+    def test_compare_flags_regressions(self):
+        """Рост запросов и времени сверх допуска считается регрессией."""
+        baseline = {'index': {'p50_ms': 10, 'p95_ms': 20, 'queries': 3,
+                              'peak_memory_kb': 100}}
+        results = {'index': {'p50_ms': 11, 'p95_ms': 30, 'queries': 4,
+                             'peak_memory_kb': 100}}
+        self.assertEqual(
+            benchmark.compare(results, baseline, tolerance=0.2),
+            ['index.p95_ms: 20 -> 30', 'index.queries: 3 -> 4'])
+
+    def test_command_fails_on_regression(self):
+        """Команда падает, если результаты хуже базовых."""
+        baseline = {'index': {'p50_ms': 0, 'p95_ms': 0, 'queries': 0,
+                              'peak_memory_kb': 0}}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            with open(path, 'w') as file:
+                json.dump(baseline, file)
+            with self.assertRaisesMessage(CommandError, 'index.queries'):
+                call_command('benchmark_views', repeat=1, baseline=path,
+                             stdout=StringIO())
@@ -0,0 +1,193 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from posts import bulk, card_cache, freshness
+from posts.models import (
+    Comment, Follow, Group, Post, SearchTerm, TimelineEntry,
+)
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class BulkPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(title='Группа', slug='first')
+        cls.target = Group.objects.create(title='Новая', slug='second')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Удаляемый пост {number}')
+            for number in range(5)
+        ]
+        cls.kept = Post.objects.create(
+            author=cls.other, group=cls.group, text='Оставшийся пост')
+        for post in cls.posts:
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий')
+
+    def call(self, name, *args):
+        out = StringIO()
+        call_command(name, *args, '--batch-size', '2', stdout=out)
+        return out.getvalue()
+
+    def test_move_command(self):
+        """Посты автора переезжают в другую группу одним UPDATE на пачку."""
+        output = self.call('move_posts', '--to', 'second', '--author',
+                           'author')
+        self.assertIn('Перенесено постов: 5', output)
+        self.assertEqual(
+            Post.objects.filter(group=self.target).count(), 5)
+        self.assertEqual(Post.objects.get(pk=self.kept.pk).group, self.group)
+        self.assertIn('Перенесено постов: 0', self.call(
+            'move_posts', '--to', 'second', '--author', 'author'))
+
+    def test_move_to_no_group(self):
+        self.call('move_posts', '--no-group', '--group', 'first')
+        self.assertFalse(Post.objects.exclude(group=None).exists())
+
+    def test_move_to_unknown_group(self):
+        with self.assertRaises(CommandError):
+            self.call('move_posts', '--to', 'missing')
+
+    def test_delete_command(self):
+        """Удаление убирает комментарии, ленты, поиск и счётчики."""
+        output = self.call('delete_posts', '--author', 'author',
+                           '--noinput')
+        self.assertIn('Удалено постов: 5, комментариев: 5', output)
+        self.assertEqual(list(Post.objects.all()), [self.kept])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(search_posts('удаляемый'), [])
+        self.assertEqual(search_posts('оставшийся'), [self.kept.pk])
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.posts_count, 0)
+        self.assertEqual(
+            User.objects.get(pk=self.other.pk).stats.posts_count, 1)
+
+    @override_settings(SEARCH_BACKEND='terms')
+    def test_delete_with_term_index(self):
+        """Без FTS5 строки поиска уходят одним DELETE вместе с постами."""
+        call_command('rebuild_search_index', stdout=StringIO())
+        bulk.delete_posts(Post.objects.filter(author=self.author))
+        self.assertEqual(
+            set(SearchTerm.objects.values_list('post', flat=True)),
+            {self.kept.pk})
+        self.assertEqual(search_posts('оставшийся'), [self.kept.pk])
+
+    def test_delete_command_asks_first(self):
+        with mock.patch('builtins.input', return_value='no'):
+            with self.assertRaises(CommandError):
+                self.call('delete_posts')
+        self.assertEqual(Post.objects.count(), 6)
+
+    def test_delete_sends_no_signals_per_row(self):
+        """Запросов на пачку столько же, сколько при одном посте."""
+        with self.assertNumQueries(14):
+            bulk.delete_posts(Post.objects.filter(author=self.author))
+
+
+class BulkPostsAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.group = Group.objects.create(title='Группа', slug='first')
+        cls.posts = [
+            Post.objects.create(author=cls.admin, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        for post in cls.posts:
+            Comment.objects.create(post=post, author=cls.admin, text='Да')
+        cls.url = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def action(self, name, posts, **data):
+        data.update({'action': name, 'index': 0,
+                     ACTION_CHECKBOX_NAME: [post.pk for post in posts]})
+        return self.client.post(self.url, data, follow=True)
+
+    def test_default_delete_action_is_replaced(self):
+        actions = self.client.get(self.url).context['action_form']
+        choices = [name for name, _ in actions.fields['action'].choices]
+        self.assertIn('delete_posts', choices)
+        self.assertNotIn('delete_selected', choices)
+
+    def test_move_action(self):
+        response = self.action('move_posts', self.posts[:2],
+                               group=self.group.pk)
+        self.assertContains(response, 'Перенесено постов: 2')
+        self.assertEqual(
+            Post.objects.filter(group=self.group).count(), 2)
+
+    def test_move_action_needs_group(self):
+        """Без выбранной группы посты не теряют группу."""
+        Post.objects.update(group=self.group)
+        response = self.action('move_posts', self.posts[:2], group='')
+        self.assertContains(response, 'Выберите группу')
+        self.assertFalse(Post.objects.filter(group=None).exists())
+
+    def test_clear_group_action(self):
+        Post.objects.update(group=self.group)
+        response = self.action('clear_group', self.posts[:2])
+        self.assertContains(response, 'Перенесено постов: 2')
+        self.assertEqual(Post.objects.filter(group=None).count(), 2)
+
+    def test_delete_action_confirms_first(self):
+        response = self.action('delete_posts', self.posts[:2])
+        self.assertContains(response, 'Будет удалено постов: 2')
+        self.assertEqual(Post.objects.count(), 3)
+        response = self.action('delete_posts', self.posts[:2], post='yes')
+        self.assertContains(
+            response, 'Удалено постов: 2, комментариев: 2')
+        self.assertEqual(list(Post.objects.all()), [self.posts[2]])
+
+    def test_delete_across_all_pages(self):
+        self.action('delete_posts', self.posts[:1], select_across=1,
+                    post='yes')
+        self.assertFalse(Post.objects.exists())
+
+
+class BulkPostsCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='first')
+        self.target = Group.objects.create(title='Новая', slug='second')
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+
+    def stamps(self):
+        return [freshness.last_modified([scope]) for scope in (
+            ('index', None), ('group', self.group.pk),
+            ('group', self.target.pk), ('author', self.author.pk),
+            ('post', self.post.pk))]
+
+    def test_move_refreshes_pages_and_cards(self):
+        """После записи сдвигаются отметки свежести и версия карточки."""
+        stamps = self.stamps()
+        version = card_cache.card_version(self.post)
+        bulk.move_posts(Post.objects.all(), self.target)
+        self.post.refresh_from_db()
+        for before, after in zip(stamps, self.stamps()):
+            self.assertGreater(after, before)
+        self.assertNotEqual(card_cache.card_version(self.post), version)
+
+    def test_delete_refreshes_pages(self):
+        stamps = self.stamps()
+        bulk.delete_posts(Post.objects.all())
+        self.assertGreater(self.stamps()[1], stamps[1])
@@ -0,0 +1,110 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts import export
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}',
+                                group=cls.group if number % 2 else None)
+            for number in range(5)
+        ]
+        Post.objects.create(author=cls.other, text='Строка 1\nстрока 2')
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.other, text='Комментарий')
+        Follow.objects.create(user=cls.other, author=cls.author)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_posts', *args, stdout=out)
+        return out.getvalue()
+
+    def test_ndjson_filters(self):
+        """NDJSON по автору и группе."""
+        lines = self.export(
+            '--author', 'author', '--group', 'test-slug').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.posts[1].pk, self.posts[3].pk])
+        self.assertEqual(rows[0]['author'], 'author')
+        self.assertEqual(rows[0]['group'], 'test-slug')
+
+    def test_date_range(self):
+        """Даты since..until включительно."""
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            pub_date=timezone.now() - timedelta(days=10))
+        today = timezone.now().date().isoformat()
+        rows = self.export('--since', today).splitlines()
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(self.export('--until', today).count('\n'), 6)
+
+    def test_csv_keeps_multiline_text(self):
+        """CSV с заголовком; переводы строк внутри текста сохраняются."""
+        rows = list(csv.DictReader(StringIO(
+            self.export('--format', 'csv', '--author', 'other'))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['text'], 'Строка 1\nстрока 2')
+        self.assertEqual(rows[0]['group'], '')
+
+    def test_comments_and_follows(self):
+        """Комментарии и подписки выгружаются той же командой."""
+        comment = json.loads(self.export('comments', '--group', 'test-slug'))
+        self.assertEqual(comment['author'], 'other')
+        follow = json.loads(self.export('follows'))
+        self.assertEqual((follow['user'], follow['author']),
+                         ('other', 'author'))
+
+    def test_inapplicable_filter(self):
+        """Подписки нельзя фильтровать по группе."""
+        with self.assertRaises(CommandError):
+            self.export('follows', '--group', 'test-slug')
+
+    def test_batches_by_primary_key(self):
+        """Выгрузка идёт пачками: запросов по числу пачек."""
+        with self.assertNumQueries(3):
+            rows = list(export.rows('posts', Post.objects.all(), 3))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len({row['id'] for row in rows}), 6)
+
+    def test_output_file(self):
+        """С --output пишется файл и число строк."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.csv')
+            message = self.export('--format', 'csv', '--output', path)
+            with open(path, newline='') as file:
+                self.assertEqual(len(list(csv.DictReader(file))), 6)
+        self.assertIn('Выгружено строк: 6', message)
+
+    def test_admin_action_streams(self):
+        """Действие админки отдаёт выбранные посты потоком."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'), {
+                'action': 'export_ndjson',
+                '_selected_action': [self.posts[0].pk, self.posts[2].pk],
+            })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(sorted(json.loads(line)['id'] for line in lines),
+                         [self.posts[0].pk, self.posts[2].pk])
@@ -1,16 +1,17 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
-from django.conf import settings
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from posts.forms import PostForm
 from posts.models import Group, Post, Comment
 from http import HTTPStatus
+from PIL import Image
 
-TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
 
 User = get_user_model()
 
@@ -169,3 +170,87 @@ class PostFormTests(TestCase):
         self.assertRedirects(
             response, f'/auth/login/?next=/posts/{self.post.id}/comment/')
         self.assertEqual(Comment.objects.count(), comment_count)
+
+
+def make_jpeg(size, name='photo.jpg', orientation=None):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'
+    if orientation:
+        exif[0x0112] = orientation
+    Image.new('RGB', size, 'blue').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, image, client=None):
+        return (client or self.client).post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с фото', 'image': image})
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_image_reencoded_without_exif(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет EXIF."""
+        self.create(make_jpeg((400, 200), orientation=6))
+        post = Post.objects.get(author=self.user)
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertFalse(image.getexif())
+
+    def test_upload_memory_logged_per_file(self):
+        """В журнал попадает прирост пика памяти именно этой загрузки."""
+        with self.assertLogs('posts.uploads', 'INFO') as logs:
+            self.create(make_jpeg((1000, 1000)))
+        self.assertRegex(logs.output[0], r'прирост пика RSS (\d+|-) КБ')
+
+    @override_settings(POST_IMAGE_MAX_BYTES=1024)
+    def test_oversized_file_rejected_while_streaming(self):
+        """Слишком тяжёлый файл отклоняется с ошибкой формы."""
+        response = self.create(make_jpeg((600, 600)))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ.')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с огромным разрешением не декодируется."""
+        response = self.create(make_jpeg((20, 20)))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка 20x20 слишком большая.')
+
+    def test_truncated_image_rejected(self):
+        """Обрезанный JPEG отклоняется формой, а не падает с 500."""
+        buffer = BytesIO()
+        Image.effect_noise((200, 200), 64).convert('RGB').save(
+            buffer, 'JPEG')
+        image = SimpleUploadedFile(
+            'broken.jpg', buffer.getvalue()[:buffer.tell() // 2],
+            'image/jpeg')
+        response = self.create(image)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл повреждён или обрезан.')
+        self.assertFalse(Post.objects.exists())
+
+    def test_csrf_still_checked(self):
+        """Подмена обработчиков загрузки не отключает проверку CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = self.create(make_jpeg((10, 10)), client)
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.exists())
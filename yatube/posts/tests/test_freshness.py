@@ -0,0 +1,165 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from posts import freshness
+from posts.models import Comment, Group, Post
+
+from .utils import run_on_commit
+
+User = get_user_model()
+
+
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='first')
+        cls.other_group = Group.objects.create(title='Другая', slug='second')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+        cls.urls = {
+            'index': reverse('posts:mane_page'),
+            'group': reverse('posts:groups', args=('first',)),
+            'profile': reverse('posts:profile', args=('author',)),
+            'detail': reverse('posts:post_detail', args=(cls.post.pk,)),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.client).get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_answer_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без шаблонов."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                second = self.revalidate(url, first)
+                self.assertEqual(second.status_code, 304)
+                self.assertFalse(second.templates)
+
+    def test_if_modified_since_is_honoured_for_guests(self):
+        """Гость получает 304 и по Last-Modified."""
+        first = self.client.get(self.urls['index'])
+        second = self.client.get(
+            self.urls['index'],
+            HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        """Правка поста меняет ETag всех его страниц."""
+        before = {name: self.client.get(url)
+                  for name, url in self.urls.items()}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        with run_on_commit():
+            post.save()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.revalidate(url, before[name])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Исправленный текст')
+
+    def test_new_comment_changes_post_detail(self):
+        """Новый комментарий меняет только страницу поста."""
+        detail = self.client.get(self.urls['detail'])
+        index = self.client.get(self.urls['index'])
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Да')
+        self.assertEqual(
+            self.revalidate(self.urls['detail'], detail).status_code, 200)
+        self.assertEqual(
+            self.revalidate(self.urls['index'], index).status_code, 304)
+
+    def test_moving_post_changes_both_groups(self):
+        """Перенос поста меняет страницы старой и новой группы."""
+        second_url = reverse('posts:groups', args=('second',))
+        first = self.client.get(self.urls['group'])
+        second = self.client.get(second_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        with run_on_commit():
+            post.save()
+        self.assertEqual(
+            self.revalidate(self.urls['group'], first).status_code, 200)
+        self.assertEqual(
+            self.revalidate(second_url, second).status_code, 200)
+
+    def test_author_rename_changes_feeds_with_cards(self):
+        """Имя автора меняет ленту, профиль и группы его постов."""
+        before = {name: self.client.get(url)
+                  for name, url in self.urls.items()}
+        self.user.first_name = 'Новое имя'
+        with run_on_commit():
+            self.user.save()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(
+                    self.revalidate(url, before[name]).status_code, 200)
+
+    def test_group_rename_changes_feeds_with_links(self):
+        """Название группы меняет ленту, группу и профили авторов."""
+        before = {name: self.client.get(url)
+                  for name, url in self.urls.items()}
+        self.group.title = 'Новое название'
+        with run_on_commit():
+            self.group.save()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(
+                    self.revalidate(url, before[name]).status_code, 200)
+
+    def test_stamps_survive_cache_loss(self):
+        """После очистки кэша ETag считается по базе и не меняется."""
+        first = self.client.get(self.urls['detail'])
+        cache.clear()
+        second = self.revalidate(self.urls['detail'], first)
+        self.assertEqual(second.status_code, 304)
+
+    def test_cache_control_for_guests_and_users(self):
+        """Гостям страница публичная, пользователю - приватная."""
+        guest = self.client.get(self.urls['index'])
+        self.assertIn('public', guest['Cache-Control'])
+        self.assertIn('max-age=30', guest['Cache-Control'])
+        self.assertTrue(guest.has_header('Last-Modified'))
+        self.client.force_login(self.user)
+        user = self.client.get(self.urls['index'])
+        self.assertIn('private', user['Cache-Control'])
+        self.assertIn('no-cache', user['Cache-Control'])
+        self.assertFalse(user.has_header('Last-Modified'))
+        self.assertNotEqual(user['ETag'], guest['ETag'])
+
+
+class StampCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.scopes = freshness.post_scopes(self.post)
+
+    def test_stamps_move_after_commit(self):
+        """
+        Пока транзакция не записана, отметка прежняя: запрос в это
+        время не получит новый ETag со старыми данными.
+        """
+        stamp = freshness.last_modified(self.scopes)
+        with transaction.atomic():
+            self.post.save()
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Да')
+            self.assertEqual(freshness.last_modified(self.scopes), stamp)
+        self.assertGreater(freshness.last_modified(self.scopes), stamp)
+
+    def test_rollback_keeps_stamps(self):
+        stamp = freshness.last_modified(self.scopes)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.post.save()
+                raise RuntimeError
+        self.assertEqual(freshness.last_modified(self.scopes), stamp)
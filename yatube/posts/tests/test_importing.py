@@ -0,0 +1,176 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from posts.importing import Importer
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+def post_line(pk, author='author', **fields):
+    return dict({'id': pk, 'author': author, 'group': 'test-slug',
+                 'text': f'Пост {pk}',
+                 'pub_date': '2015-06-01T12:00:00+00:00'}, **fields)
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Group.objects.create(title='Группа', slug='test-slug')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'posts.ndjson')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, *records):
+        with open(self.path, 'w') as file:
+            for record in records:
+                line = record if isinstance(record, str) else json.dumps(
+                    record, ensure_ascii=False)
+                file.write(line + '\n')
+
+    def import_posts(self, *args):
+        out = StringIO()
+        call_command('import_posts', self.path, '--batch-size', '2', *args,
+                     stdout=out)
+        return out.getvalue()
+
+    def test_posts_and_comments_keep_ids_and_dates(self):
+        """Посты и комментарии получают исходные id и даты."""
+        self.write(
+            post_line(100),
+            post_line(101, group=None, updated='2016-01-01T00:00:00Z'),
+            {'id': 7, 'post': 100, 'author': 'reader', 'text': 'Ответ',
+             'created': '2015-06-02T08:00:00Z'},
+        )
+        output = self.import_posts()
+        self.assertIn('Постов: 2, комментариев: 1', output)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertEqual(post.group.slug, 'test-slug')
+        self.assertEqual(Post.objects.get(pk=101).updated.year, 2016)
+        comment = Comment.objects.get(pk=7)
+        self.assertEqual((comment.post_id, comment.author), (100, self.reader))
+        self.assertEqual(comment.created.day, 2)
+
+    def test_derived_data_is_updated(self):
+        """Счётчики, лента подписчика и поиск видят загруженное."""
+        self.write(post_line(100, text='Импортированный текст'),
+                   {'id': 7, 'post': 100, 'author': 'reader', 'text': 'Да',
+                    'created': '2015-06-02T08:00:00Z'})
+        self.import_posts()
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.posts_count, 1)
+        self.assertEqual(Post.objects.get(pk=100).comments_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post_id=100).exists())
+        self.assertEqual(search_posts('импортированный'), [100])
+
+    def test_bad_lines_are_skipped(self):
+        """Битые строки и неизвестные авторы пропускаются с номером."""
+        self.write(post_line(100), '{broken', post_line(101, author='ghost'),
+                   {'id': 7, 'post': 999, 'author': 'reader',
+                    'created': '2015-06-02T08:00:00Z'})
+        output = self.import_posts()
+        self.assertIn('строка 2:', output)
+        self.assertIn('нет пользователя ghost', output)
+        self.assertIn('нет поста 999', output)
+        self.assertIn('пропущено: 3', output)
+        self.assertEqual(list(Post.objects.values_list('pk', flat=True)),
+                         [100])
+
+    def test_export_round_trip_keeps_images(self):
+        """Имя картинки из export_posts переносится в пост."""
+        Post.objects.create(pk=50, author=self.author, text='С картинкой',
+                            image='posts/photo.jpg')
+        out = StringIO()
+        call_command('export_posts', stdout=out)
+        Post.objects.all().delete()
+        with open(self.path, 'w') as file:
+            file.write(out.getvalue())
+        self.import_posts()
+        post = Post.objects.get(pk=50)
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        self.assertFalse(post.thumbnails_ready)
+
+    def test_wrong_types_are_skipped(self):
+        """Автор или картинка не строкой - ошибка строки, а не сбой."""
+        self.write(post_line(100, author={'name': 'author'}),
+                   post_line(101, author=['author']),
+                   post_line(102, image=7),
+                   post_line(103, group=['test-slug']))
+        output = self.import_posts()
+        self.assertIn('строка 1: нет username автора', output)
+        self.assertIn('строка 3: image должен быть именем файла', output)
+        self.assertIn('строка 4: нет slug группы', output)
+        self.assertIn('пропущено: 4', output)
+
+    def test_create_missing(self):
+        """--create-missing заводит авторов и группы."""
+        self.write(post_line(100, author='ghost', group='new-group'))
+        self.import_posts('--create-missing')
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.author.username, 'ghost')
+        self.assertEqual(post.group.slug, 'new-group')
+
+    def test_interrupted_import_resumes(self):
+        """После сбоя импорт продолжается с первой незаписанной пачки."""
+        self.write(*(post_line(pk) for pk in range(100, 105)))
+        state = f'{self.path}.state'
+        original = Importer.import_batch
+        calls = []
+
+        def failing(importer, batch):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            return original(importer, batch)
+
+        with mock.patch.object(Importer, 'import_batch', failing):
+            with self.assertRaises(RuntimeError):
+                self.import_posts()
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertTrue(os.path.exists(state))
+        output = self.import_posts()
+        self.assertIn('Постов: 5', output)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_replayed_rows_are_skipped(self):
+        """Уже загруженные id не дублируются."""
+        self.write(post_line(100), post_line(100))
+        self.import_posts()
+        output = self.import_posts('--restart')
+        self.assertIn('Постов: 0', output)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_id_collisions_are_errors(self):
+        """Чужая запись с тем же id - ошибка, а не повтор."""
+        Post.objects.create(pk=100, author=self.reader, text='Местный')
+        Post.objects.create(pk=101, author=self.author, text='Ещё один')
+        Comment.objects.create(
+            pk=7, post_id=101, author=self.author, text='Местный')
+        self.write(post_line(100), post_line(102),
+                   {'id': 7, 'post': 102, 'author': 'reader',
+                    'text': 'Ответ', 'created': '2015-06-02T08:00:00Z'})
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, 'Не загружено строк: 2'):
+            call_command('import_posts', self.path, stdout=out)
+        self.assertIn('строка 1: id 100 занят другой записью',
+                      out.getvalue())
+        self.assertIn('строка 3: id 7 занят', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=100).text, 'Местный')
+        self.assertTrue(Post.objects.filter(pk=102).exists())
@@ -1,7 +1,17 @@
+from io import StringIO
+from unittest import skipUnless
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
-from posts.models import Group, Post
+from django.test.utils import CaptureQueriesContext
+from posts import freshness
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserStats,
+)
+from posts.timeline import timeline_posts
 
 
 User = get_user_model()
@@ -38,3 +48,132 @@ class PostModelTest(TestCase):
         for field, excpected_value in field_verboses.items():
             with self.subTest(field=field):
                 self.assertEqual(field, excpected_value)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            if 'SCAN' in line or 'SEARCH' in line:
+                self.assertRegex(
+                    line, 'INDEX|PRIMARY KEY', f'Полный скан таблицы: {plan}'
+                )
+
+    def test_feed_queries_use_indexes(self):
+        """Каждый запрос ленты читает строки по индексу."""
+        feeds = {
+            'index': Post.objects.all(),
+            'group_posts': self.group.posts.all(),
+            'profile': self.user.posts.all(),
+            'follow_index': timeline_posts(self.user),
+        }
+        for name, queryset in feeds.items():
+            with self.subTest(feed=name):
+                self.assertUsesIndex(
+                    queryset.order_by('-pub_date', '-pk')[:11]
+                )
+
+    def test_feeds_are_read_in_index_order(self):
+        """Ленты без подписок не сортируются во временной таблице."""
+        for queryset in (Post.objects.all(), self.group.posts.all(),
+                         self.user.posts.all()):
+            with self.subTest(queryset=queryset.query):
+                self.assertNotIn(
+                    'TEMP B-TREE',
+                    queryset.order_by('-pub_date', '-pk')[:11].explain()
+                )
+
+    def test_timeline_page_is_index_range_scan(self):
+        """Страница ленты подписок читается по индексу без сортировки."""
+        entries = TimelineEntry.objects.filter(user=self.user).order_by(
+            '-pub_date', '-post_id').values_list('pub_date', 'post_id')
+        plan = entries[:11].explain()
+        self.assertIn('timeline_user_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_comment_page_is_index_range_scan(self):
+        """Страница комментариев читается по индексу без сортировки."""
+        plan = Comment.objects.filter(post_id=1).order_by(
+            '-created', '-pk')[:21].explain()
+        self.assertIn('comment_post_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_stamps_are_read_from_indexes(self):
+        """Отметка свежести на промахе кэша не сканирует все посты."""
+        for scope in (('index', None), ('group', self.group.pk),
+                      ('author', self.user.pk)):
+            with self.subTest(scope=scope):
+                with CaptureQueriesContext(connection) as queries:
+                    freshness._from_db(*scope)
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN '
+                                   + queries.captured_queries[0]['sql'])
+                    plan = ' '.join(str(row) for row in cursor.fetchall())
+                self.assertIn('_updated_idx', plan)
+
+    def test_follow_lookup_uses_index(self):
+        """Проверка подписки читает уникальный индекс Follow."""
+        self.assertUsesIndex(
+            Follow.objects.filter(user=self.user, author=self.user)
+        )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев следуют за созданием и удалением."""
+        post = Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_follow_counters(self):
+        """Подписка меняет счётчики подписчиков и подписок."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_cascade_delete_keeps_counters(self):
+        """Удаление пользователя каскадом поправляет чужие счётчики."""
+        reader = User.objects.create_user(username='leaving_reader')
+        Follow.objects.create(user=reader, author=self.author)
+        Comment.objects.create(
+            post=self.post, author=reader, text='Комментарий')
+        reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_recount_command_fixes_drift(self):
+        """Команда recount_stats исправляет разошедшиеся счётчики."""
+        UserStats.objects.update(posts_count=42)
+        Post.objects.update(comments_count=7)
+        call_command('recount_stats', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
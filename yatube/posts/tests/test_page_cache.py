@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Group, Post
+
+from .utils import run_on_commit
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_SECONDS=60)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        Post.objects.create(
+            author=cls.author, text='Первый пост', group=cls.group)
+        cls.urls = (
+            reverse('posts:mane_page'),
+            reverse('posts:groups', args=('test-slug',)),
+            reverse('posts:profile', args=('author',)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_gets_cached_page(self):
+        """Повторный гостевой запрос не рисует шаблонов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertTrue(first.templates)
+                self.assertNotContains(first, '<!--hole')
+                second = self.client.get(url)
+                self.assertFalse(second.templates)
+                self.assertEqual(second.content, first.content)
+                self.assertIn('public', second['Cache-Control'])
+
+    def test_cached_index_makes_no_queries(self):
+        """Главная из кэша обходится без базы."""
+        self.client.get(reverse('posts:mane_page'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('posts:mane_page'))
+
+    def test_cached_page_answers_not_modified(self):
+        """Копия из кэша тоже отвечает 304 по ETag."""
+        first = self.client.get(reverse('posts:mane_page'))
+        self.client.get(reverse('posts:mane_page'))
+        response = self.client.get(
+            reverse('posts:mane_page'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_purges_pages(self):
+        """Новый пост области сразу виден на всех её страницах."""
+        for url in self.urls:
+            self.client.get(url)
+        with run_on_commit():
+            Post.objects.create(
+                author=self.author, text='Свежий пост', group=self.group)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_user_gets_own_holes(self):
+        """Вошедший пользователь видит в кэшированной странице себя."""
+        url = reverse('posts:profile', args=('author',))
+        self.client.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(url)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertNotIn(
+            'posts/profile.html',
+            [template.name for template in response.templates])
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Отписаться')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_guest_copy_ignores_other_params(self):
+        """Посторонние параметры адреса кэш не используют."""
+        url = reverse('posts:mane_page')
+        self.client.get(url, {'utm': 'mail'})
+        self.assertTrue(self.client.get(url, {'utm': 'mail'}).templates)
+
+    @override_settings(PAGE_CACHE_SECONDS=0)
+    def test_disabled_cache_renders_every_time(self):
+        """При PAGE_CACHE_SECONDS = 0 страница рисуется каждый раз."""
+        self.client.get(reverse('posts:mane_page'))
+        self.assertTrue(self.client.get(reverse('posts:mane_page')).templates)
@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Post
+from posts.search import search_posts, stem
+
+User = get_user_model()
+
+
+class StemTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к общей основе."""
+        for first, second in (('кошками', 'кошка'),
+                              ('прогулки', 'прогулкой'),
+                              ('читали', 'читать'),
+                              ('Ёлки', 'ёлка')):
+            with self.subTest(first=first, second=second):
+                self.assertEqual(stem(first), stem(second))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Мои кошки любят долгие прогулки')
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собака гуляет во дворе')
+        Comment.objects.create(
+            post=cls.dogs, author=cls.user, text='А кошка смотрит в окно')
+
+    def test_finds_word_forms_in_posts_and_comments(self):
+        """Поиск учитывает формы слова, пост выше комментария."""
+        self.assertEqual(search_posts('кошкой'), [self.cats.pk, self.dogs.pk])
+
+    def test_all_words_required(self):
+        """Пост должен содержать все слова запроса."""
+        self.assertEqual(search_posts('кошки прогулкой'), [self.cats.pk])
+        self.assertEqual(search_posts('кошки трамвай'), [])
+
+    def test_words_must_meet_in_one_text(self):
+        """Слова ищутся в одном тексте: посте или одном комментарии."""
+        self.assertEqual(search_posts('собака окно'), [])
+        self.assertEqual(search_posts('кошка окно'), [self.dogs.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении."""
+        self.dogs.text = 'Трамвай едет'
+        self.dogs.save()
+        self.assertEqual(search_posts('трамваи'), [self.dogs.pk])
+        self.dogs.comments.all().delete()
+        self.assertEqual(search_posts('кошка'), [self.cats.pk])
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты."""
+        response = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page_obj']), [self.cats, self.dogs])
+        self.assertEqual(
+            len(self.client.get(reverse('posts:search')).context['page_obj']),
+            0)
+
+
+@override_settings(SEARCH_BACKEND='terms')
+class TermIndexSearchTests(SearchTests):
+    """Те же проверки для индекса в таблице SearchTerm."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command('rebuild_search_index', stdout=StringIO())
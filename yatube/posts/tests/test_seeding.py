@@ -0,0 +1,105 @@
+import json
+import os
+import random
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.seeding import DEFAULTS, PowerLaw, Seeder
+
+SMALL = dict(DEFAULTS, users=30, groups=4, posts=200, comments=50,
+             follows=120)
+
+
+class SeederTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.state = os.path.join(self.directory.name, 'state.json')
+
+    def test_seed_creates_rows_and_derived_data(self):
+        """Создаются все записи, счётчики и ленты пересобираются."""
+        Seeder(SMALL, self.state, batch_size=64).run()
+        self.assertEqual(User.objects.count(), SMALL['users'])
+        self.assertEqual(Group.objects.count(), SMALL['groups'])
+        self.assertEqual(Post.objects.count(), SMALL['posts'])
+        self.assertEqual(Comment.objects.count(), SMALL['comments'])
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        author = Post.objects.first().author
+        self.assertEqual(author.stats.posts_count, author.posts.count())
+
+    def test_posts_updated_with_their_dates(self):
+        """Дата изменения поста совпадает с датой публикации."""
+        Seeder(SMALL, self.state, batch_size=64).run()
+        self.assertFalse(Post.objects.exclude(updated=F('pub_date')).exists())
+        self.assertGreater(
+            Post.objects.aggregate(days=Count('pub_date__date',
+                                              distinct=True))['days'], 1)
+
+    def test_posts_per_author_follow_power_law(self):
+        """Самый активный автор пишет намного больше медианного."""
+        Seeder(SMALL, self.state, batch_size=64).run()
+        counts = sorted(
+            Counter(Post.objects.values_list('author', flat=True)).values())
+        self.assertGreater(counts[-1], 5 * counts[len(counts) // 2])
+
+    def test_resume_skips_finished_batches(self):
+        """Повторный запуск продолжает с недописанной пачки."""
+        seeder = Seeder(SMALL, self.state, batch_size=64)
+        for phase in ('users', 'groups'):
+            seeder.run_phase(phase)
+        with open(self.state) as file:
+            state = json.load(file)
+        state['done']['posts'] = 1
+        with open(self.state, 'w') as file:
+            json.dump(state, file)
+        Seeder(SMALL, self.state, batch_size=64).run()
+        self.assertEqual(Post.objects.count(), SMALL['posts'] - 64)
+        self.assertEqual(User.objects.count(), SMALL['users'])
+
+    def test_replayed_batch_is_not_duplicated(self):
+        """Пачка, записанная перед сбоем, при повторе не дублируется."""
+        Seeder(SMALL, self.state, batch_size=64).run()
+        with open(self.state) as file:
+            state = json.load(file)
+        state['done'].update(posts=1, comments=0)
+        state['derived'] = False
+        with open(self.state, 'w') as file:
+            json.dump(state, file)
+        Seeder(SMALL, self.state, batch_size=64).run()
+        self.assertEqual(Post.objects.count(), SMALL['posts'])
+        self.assertEqual(Comment.objects.count(), SMALL['comments'])
+
+    def test_workers_generate_same_rows(self):
+        """Пул процессов даёт те же данные, что и один процесс."""
+        Seeder(SMALL, self.state, batch_size=64, workers=2).run()
+        self.assertEqual(Post.objects.count(), SMALL['posts'])
+        parallel = list(Post.objects.order_by('pk').values_list(
+            'author__username', 'pub_date'))
+        Post.objects.all().delete()
+        os.remove(self.state)
+        Seeder(SMALL, self.state, batch_size=64).run_phase('posts')
+        self.assertEqual(
+            [author for author, _ in parallel],
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', flat=True)))
+
+    def test_changed_options_need_restart(self):
+        """Файл состояния от других параметров не используется молча."""
+        Seeder(SMALL, self.state).run_phase('users')
+        with self.assertRaises(CommandError):
+            call_command('seed_yatube', users=10, state=self.state,
+                         stdout=StringIO())
+
+    def test_power_law_prefers_low_ranks(self):
+        """Младшие ранги выпадают чаще старших."""
+        law = PowerLaw(100, 1.2)
+        rnd = random.Random(0)
+        samples = Counter(law.sample(rnd) for _ in range(5000))
+        self.assertGreater(samples[0], samples[50] * 10)
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts.models import Post, thumbnail_name
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+User = get_user_model()
+
+
+def make_image(name='photo.png', size=(40, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user')
+        self.client.force_login(self.user)
+
+    def test_create_generates_all_sizes(self):
+        """После создания поста готовы миниатюры всех размеров."""
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой', 'image': make_image()})
+        post = Post.objects.get()
+        self.assertTrue(post.thumbnails_ready)
+        storage = post.image.storage
+        for size, dimensions in settings.POST_THUMBNAILS.items():
+            with self.subTest(size=size):
+                name = thumbnail_name(post.image.name, size)
+                with storage.open(name) as thumbnail:
+                    self.assertEqual(Image.open(thumbnail).size, dimensions)
+        response = self.client.get(reverse('posts:mane_page'))
+        self.assertContains(response, post.card_image_url)
+        self.assertNotEqual(post.card_image_url, post.image.url)
+
+    def test_new_image_on_edit_regenerates(self):
+        """Замена картинки пересоздаёт миниатюры для нового файла."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image('old.png'))
+        self.assertEqual(post.card_image_url, post.image.url)
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Пост', 'image': make_image('new.png')})
+        old_name = post.image.name
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertTrue(post.image.storage.exists(
+            thumbnail_name(post.image.name, 'detail')))
+        self.assertFalse(post.image.storage.exists(
+            thumbnail_name(old_name, 'detail')))
+
+    def test_delete_removes_thumbnails(self):
+        """Миниатюры удалённого поста не остаются в хранилище."""
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой', 'image': make_image()})
+        post = Post.objects.get()
+        storage = post.image.storage
+        names = [thumbnail_name(post.image.name, size)
+                 for size in settings.POST_THUMBNAILS]
+        self.assertTrue(all(storage.exists(name) for name in names))
+        post.delete()
+        self.assertFalse(any(storage.exists(name) for name in names))
@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from posts.models import Follow, Post, TimelineEntry
+from posts.timeline import TimelinePaginator, rebuild, timeline_posts
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertIn(post, timeline_posts(self.reader))
+
+    def test_unfollow_drops_author_posts(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+        self.assertFalse(timeline_posts(self.reader).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_read_on_demand(self):
+        """Посты крупного автора не рассылаются, но видны в ленте."""
+        post = Post.objects.create(author=self.author, text='Популярный')
+        post.refresh_from_db()
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, timeline_posts(self.reader))
+
+    def test_rebuild_command_restores_timelines(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(timeline_posts(self.reader)), [self.old_post])
+
+    def test_rebuild_in_batches(self):
+        """Пересборка пачками восстанавливает записи вместе с датами."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        Post.objects.create(author=self.author, text='Новый')
+        expected = set(TimelineEntry.objects.values_list(
+            'user', 'post', 'pub_date'))
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=self.author, post=self.old_post,
+            pub_date=self.old_post.pub_date)
+        self.assertEqual(rebuild(batch_size=1), 2)
+        self.assertEqual(set(TimelineEntry.objects.values_list(
+            'user', 'post', 'pub_date')), expected)
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class TimelinePaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        light = User.objects.create_user(username='light')
+        heavy = User.objects.create_user(username='heavy')
+        Follow.objects.create(user=cls.reader, author=light)
+        Follow.objects.create(user=cls.reader, author=heavy)
+        Follow.objects.create(user=cls.fan, author=heavy)
+        start = timezone.now()
+        for number in range(7):
+            for author in (light, heavy):
+                post = Post.objects.create(
+                    author=author, text=f'{author.username} {number}')
+                # Одинаковые даты у пар постов проверяют порядок по id.
+                Post.objects.filter(pk=post.pk).update(
+                    pub_date=start - timedelta(minutes=number))
+        TimelineEntry.objects.update(pub_date=start)
+        rebuild()
+
+    def test_pages_merge_entries_and_heavy_authors(self):
+        """Страницы по курсору идут в порядке ленты в обе стороны."""
+        expected = list(timeline_posts(self.reader).order_by(
+            '-pub_date', '-pk'))
+        self.assertEqual(len(expected), 14)
+        self.assertEqual(Post.objects.filter(fanned_out=False).count(), 7)
+        paginator = TimelinePaginator(Post.objects.all(), 4, self.reader)
+        page = paginator.get_page()
+        pages = [list(page)]
+        while page.next_cursor:
+            page = paginator.get_page(cursor=page.next_cursor)
+            pages.append(list(page))
+        self.assertEqual(sum(pages, []), expected)
+        page = paginator.get_page(cursor=page.previous_cursor)
+        self.assertEqual(list(page), pages[-2])
+        self.assertEqual(list(paginator.get_page(2)), pages[1])
@@ -2,9 +2,15 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from posts import author_cards, card_cache
 from posts.models import Comment, Follow, Group, Post
+from posts.utils import COMMENTS_PER_PAGE
+
+from .utils import QueryBudgetMixin, run_on_commit
 
 
 User = get_user_model()
@@ -179,20 +185,43 @@ class GroupViewsTests(TestCase):
         )
 
     def test_cache_index_page(self):
-        """Тест кэширования index."""
+        """Тест кэширования карточек постов на index."""
         new_post = Post.objects.create(
             author=self.user,
             text='Новый тестовый пост',
             group=self.group,
         )
         response = self.authorized_client.get(reverse('posts:mane_page'))
-        temp = response.content
-        new_post.delete()
+        self.assertContains(response, new_post.text)
+        Post.objects.filter(pk=new_post.pk).update(text='Изменено в обход')
         response = self.authorized_client.get(reverse('posts:mane_page'))
-        self.assertEqual(response.content, temp)
-        cache.clear()
+        self.assertContains(response, new_post.text)
+        new_post.text = 'Отредактированный пост'
+        with run_on_commit():
+            new_post.save()
         response = self.authorized_client.get(reverse('posts:mane_page'))
-        self.assertNotEqual(response.content, temp)
+        self.assertContains(response, 'Отредактированный пост')
+        with run_on_commit():
+            new_post.delete()
+        response = self.authorized_client.get(reverse('posts:mane_page'))
+        self.assertNotContains(response, 'Отредактированный пост')
+
+    def test_post_card_invalidated_by_author_and_group(self):
+        """Карточка обновляется при изменении автора и группы."""
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.authorized_client.get(url)
+        self.user.first_name = 'Новое'
+        self.user.last_name = 'Имя'
+        with run_on_commit():
+            self.user.save()
+        self.assertContains(self.authorized_client.get(url), 'Новое Имя')
+        self.group.slug = 'new-slug'
+        with run_on_commit():
+            self.group.save()
+        self.assertContains(
+            self.authorized_client.get(url), '/group/new-slug/')
+        self.group.slug = 'test-slug'
+        self.group.save()
 
     def test_follow_index_show_cont(self):
         """Шаблон follow сформирован с правильным контекстом."""
@@ -336,3 +365,229 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(
             len(response.context['page_obj']), settings.AMOUNT_EXPECTED
         )
+
+    def test_paginator_next_cursor_opens_second_page(self):
+        """Курсор следующей страницы ведёт на оставшиеся посты."""
+        response = self.client.get(reverse('posts:mane_page'))
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(
+            reverse('posts:mane_page'), {'cursor': next_cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            len(page_obj), settings.AMOUNT_TEST - settings.AMOUNT_EXPECTED)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+        response = self.client.get(
+            reverse('posts:mane_page'),
+            {'cursor': page_obj.previous_cursor})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.AMOUNT_EXPECTED)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_paginator_cursor_is_stable_for_new_posts(self):
+        """Новый пост не сдвигает уже открытую страницу."""
+        response = self.client.get(reverse('posts:profile',
+                                           args=(self.user.username,)))
+        next_cursor = response.context['page_obj'].next_cursor
+        expected = [post.pk for post in Post.objects.order_by(
+            '-pub_date', '-pk')[settings.AMOUNT_EXPECTED:]]
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user.username,)),
+            {'cursor': next_cursor})
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']], expected)
+
+    def test_paginator_does_not_count_rows(self):
+        """Пагинация не выполняет COUNT(*) по таблице постов."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:groups',
+                                    kwargs={'slug': 'test-slug'}))
+        self.assertFalse(
+            [query for query in queries.captured_queries
+             if 'COUNT(' in query['sql'].upper()])
+
+    def test_paginator_broken_cursor_returns_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.client.get(
+            reverse('posts:mane_page'), {'cursor': 'broken'})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.AMOUNT_EXPECTED)
+
+
+class PostDetailQueriesTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+        for number in range(5):
+            commenter = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {number}')
+        cls.url = reverse('posts:post_detail', args=(cls.post.id,))
+
+    def test_post_detail_query_budget_for_guest(self):
+        """
+        Страница поста не зависит от числа комментариев по запросам:
+        области свежести, пост и комментарии.
+        """
+        with self.assertQueryBudget(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertContains(response, 'reader4')
+
+    def test_post_detail_query_budget_for_user(self):
+        """Авторизованному пользователю добавляются только сессия и user."""
+        self.client.force_login(self.user)
+        with self.assertQueryBudget(5):
+            self.client.get(self.url)
+
+
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+        cls.detail_url = reverse('posts:post_detail', args=(cls.post.id,))
+        cls.comments_url = reverse('posts:comments', args=(cls.post.id,))
+
+    def test_post_detail_shows_first_comment_page(self):
+        """На странице поста только первая страница комментариев."""
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertIsNotNone(comments.next_cursor)
+        self.assertContains(response, 'Показать ещё')
+
+    def test_comments_fragment_continues_from_cursor(self):
+        """Фрагмент по курсору отдаёт оставшиеся комментарии."""
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.comments_url, {'cursor': first.next_cursor})
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        rest = response.context['comments']
+        self.assertEqual(len(rest), 5)
+        self.assertIsNone(rest.next_cursor)
+        self.assertFalse(
+            {comment.pk for comment in first}
+            & {comment.pk for comment in rest})
+
+    def test_comments_oldest_first(self):
+        """Комментарии идут от старых к новым, как раньше."""
+        comments = self.client.get(self.detail_url).context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments[:2]],
+            ['Комментарий 0', 'Комментарий 1'])
+
+    def test_comment_pages_link_back_without_js(self):
+        """Страница поста по курсору ссылается и назад, и вперёд."""
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.detail_url, {'cursor': first.next_cursor})
+        self.assertContains(response, 'Предыдущие комментарии')
+        back = self.client.get(
+            self.detail_url,
+            {'cursor': response.context['comments'].previous_cursor})
+        self.assertEqual(
+            [comment.pk for comment in back.context['comments']],
+            [comment.pk for comment in first])
+        fragment = self.client.get(
+            self.comments_url, {'cursor': first.next_cursor})
+        self.assertNotContains(fragment, 'Предыдущие комментарии')
+
+    def test_comments_fragment_as_json(self):
+        """С ?format=json фрагмент отдаётся в JSON."""
+        data = self.client.get(
+            self.comments_url, {'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), COMMENTS_PER_PAGE)
+        self.assertEqual(data['comments'][0]['author'], 'test_user')
+        self.assertTrue(data['next_cursor'])
+
+    def test_comments_fragment_for_missing_post(self):
+        """Для несуществующего поста фрагмент отвечает 404."""
+        response = self.client.get(
+            reverse('posts:comments', args=(self.post.id + 100,)))
+        self.assertEqual(response.status_code, 404)
+
+
+class AuthorCardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        for number in range(3):
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_render_author_card(self):
+        """Карточки постов берут имя и ссылку из карточки автора."""
+        profile_url = reverse('posts:profile', args=('author',))
+        for url in (reverse('posts:mane_page'), profile_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Автор: Лев Толстой', count=3)
+                self.assertContains(
+                    response, f'href="{profile_url}"', count=3)
+
+    def test_author_card_is_read_from_cache(self):
+        """С тёплым кэшем автор не читается из базы."""
+        self.client.get(reverse('posts:mane_page'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:mane_page'))
+        self.assertFalse(
+            [query for query in queries.captured_queries
+             if 'auth_user' in query['sql']])
+
+    def test_author_card_invalidated_on_user_save(self):
+        """После сохранения пользователя карточка собирается заново."""
+        self.client.get(reverse('posts:mane_page'))
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Алексей'
+        with run_on_commit():
+            author.save()
+        response = self.client.get(reverse('posts:mane_page'))
+        self.assertContains(response, 'Алексей Толстой', count=3)
+
+
+class CardVersionCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='first')
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+
+    def test_versions_change_after_commit(self):
+        """
+        До записи транзакции читатель видит старые строки и старую
+        версию карточки, после - новую.
+        """
+        version = card_cache.card_version(self.post)
+        author_cards.get_cards([self.author.pk])
+        with transaction.atomic():
+            self.post.text = 'Правка'
+            self.post.save()
+            self.group.save()
+            self.author.save()
+            self.assertEqual(card_cache.card_version(self.post), version)
+            self.assertTrue(cache.get(
+                author_cards.CARD_KEY.format(self.author.pk)))
+        self.assertNotEqual(card_cache.card_version(self.post), version)
+        self.assertIsNone(cache.get(
+            author_cards.CARD_KEY.format(self.author.pk)))
+
+    def test_rollback_keeps_versions(self):
+        version = card_cache.card_version(self.post)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.post.save()
+                raise RuntimeError
+        self.assertEqual(card_cache.card_version(self.post), version)
@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что код укладывается в заданное число SQL-запросов."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using=connection):
+        with CaptureQueriesContext(using) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f'{executed} запросов при бюджете {budget}:\n{queries}')
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """
+    Выполняет колбэки transaction.on_commit, отложенные внутри блока:
+    TestCase транзакцию не записывает, и сами они не сработают.
+    """
+    callbacks = connections[using].run_on_commit
+    start = len(callbacks)
+    yield
+    while len(callbacks) > start:
+        _, callback = callbacks.pop(start)
+        callback()
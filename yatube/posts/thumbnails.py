@@ -0,0 +1,99 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import card_cache, freshness
+from .models import Post, thumbnail_name
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def render_thumbnail(image, size):
+    """Обрезка по центру с увеличением, как crop="center" upscale=True."""
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(buffer, 'JPEG', quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+def generate(post_id, image_name):
+    """
+    Записывает все размеры миниатюр и отмечает пост готовым, если его
+    картинка за это время не поменялась.
+    """
+    storage = Post._meta.get_field('image').storage
+    with storage.open(image_name) as source:
+        image = Image.open(source)
+        image.load()
+    for size, dimensions in settings.POST_THUMBNAILS.items():
+        name = thumbnail_name(image_name, size)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(render_thumbnail(image, dimensions)))
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        thumbnails_ready=True, updated=timezone.now())
+    if updated:
+        card_cache.bump('post', post_id)
+        freshness.touch(*freshness.post_scopes(Post.objects.only(
+            'author_id', 'group_id').get(pk=post_id)))
+
+
+def _generate_safely(post_id, image_name):
+    try:
+        generate(post_id, image_name)
+    except (OSError, ValueError):
+        logger.exception('Не удалось создать миниатюры поста %s', post_id)
+
+
+def _generate_in_worker(post_id, image_name):
+    try:
+        _generate_safely(post_id, image_name)
+    finally:
+        close_old_connections()
+
+
+def remove(image_names):
+    """Удаляет миниатюры картинок после фиксации транзакции."""
+    image_names = [name for name in image_names if name]
+    if not image_names:
+        return
+
+    def delete():
+        storage = Post._meta.get_field('image').storage
+        for image_name in image_names:
+            for size in settings.POST_THUMBNAILS:
+                storage.delete(thumbnail_name(image_name, size))
+
+    transaction.on_commit(delete)
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр в пул после фиксации транзакции."""
+    post_id, image_name = post.pk, post.image.name
+
+    def submit():
+        if settings.THUMBNAIL_WORKERS:
+            _get_executor().submit(_generate_in_worker, post_id, image_name)
+        else:
+            _generate_safely(post_id, image_name)
+
+    transaction.on_commit(submit)
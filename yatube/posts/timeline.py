@@ -0,0 +1,180 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from .models import Follow, Post, TimelineEntry, User, UserStats
+from .utils import NEXT, CursorPaginator
+
+# Пользователей на транзакцию при пересборке лент.
+REBUILD_BATCH_SIZE = 500
+
+
+def is_heavy_author(author_id):
+    """Автор, чьи посты слишком дорого рассылать всем подписчикам."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def _heavy_posts(user):
+    return Post.objects.filter(
+        fanned_out=False,
+        author__in=Follow.objects.filter(user=user).values('author'))
+
+
+def timeline_posts(user):
+    """
+    Лента подписок: материализованные записи пользователя плюс посты
+    крупных авторов, которые читаются напрямую без рассылки. Страницы
+    ленты собирает TimelinePaginator.
+    """
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(fanned_out=False,
+            author__in=Follow.objects.filter(user=user).values('author'))
+    )
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Страницы ленты подписок без сортировки всей ленты.
+
+    Ключи (pub_date, id) страницы берутся из двух уже упорядоченных
+    источников: записей ленты по индексу (user, -pub_date, -post) и
+    постов крупных авторов по индексу (author, -pub_date, -id). Они
+    сливаются в Python, затем посты страницы читаются по id из
+    object_list.
+    """
+
+    def __init__(self, object_list, per_page, user):
+        super().__init__(object_list, per_page)
+        self.user = user
+
+    def _keys(self, queryset, pk_field, direction, position, stop):
+        queryset = queryset.order_by('-pub_date', f'-{pk_field}')
+        if position is not None:
+            queryset = self.after(
+                queryset, direction, *position, pk_field=pk_field)
+        return list(queryset.values_list('pub_date', pk_field)[:stop])
+
+    def rows(self, direction, position, limit, offset=0):
+        stop = offset + limit
+        keys = set(self._keys(
+            TimelineEntry.objects.filter(user=self.user), 'post_id',
+            direction, position, stop))
+        keys.update(self._keys(
+            _heavy_posts(self.user), 'pk', direction, position, stop))
+        keys = sorted(keys, reverse=direction == NEXT)[offset:stop]
+        posts = {self._key(row)[1]: row for row in self.object_list.filter(
+            pk__in=[pk for _, pk in keys])}
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+
+def timeline_paginator(user):
+    """Класс пагинатора для paginate() с лентой пользователя user."""
+    return partial(TimelinePaginator, user=user)
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_heavy_author(post.author_id):
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        post.fanned_out = False
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика уже опубликованные посты."""
+    posts = Post.objects.filter(
+        author_id=author_id, fanned_out=True).values_list('pk', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def drop(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def refresh_fan_out_flags():
+    """Заново решает, какие авторы рассылают посты по лентам."""
+    heavy = (
+        Follow.objects.values('author').annotate(followers=Count('id'))
+        .filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values('author')
+    )
+    Post.objects.exclude(author__in=heavy).update(fanned_out=True)
+    Post.objects.filter(author__in=heavy).update(fanned_out=False)
+
+
+def _user_batches(user_ids, batch_size):
+    if user_ids is not None:
+        user_ids = sorted(set(user_ids))
+        for start in range(0, len(user_ids), batch_size):
+            yield user_ids[start:start + batch_size]
+        return
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        batch = list(users.filter(pk__gt=last)[:batch_size])
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+
+
+def _refill(user_ids):
+    """Записи лент пользователей одним INSERT ... SELECT по подпискам."""
+    select = Post.objects.filter(
+        fanned_out=True, author__following__user_id__in=user_ids,
+    ).order_by().values_list('author__following__user_id', 'pk', 'pub_date')
+    sql, params = select.query.sql_with_params()
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{table} (user_id, post_id, pub_date) {sql} '
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)}',
+            params)
+
+
+def rebuild(user_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Пересобирает ленты по текущим подпискам: все, если user_ids не
+    задан, иначе только указанных пользователей. Каждая пачка из
+    batch_size пользователей пересобирается в своей транзакции, так что
+    ленты других пользователей не ждут всей пересборки. Возвращает
+    число обработанных подписок.
+    """
+    if user_ids is None:
+        with transaction.atomic():
+            refresh_fan_out_flags()
+    processed = 0
+    for batch in _user_batches(user_ids, batch_size):
+        with transaction.atomic():
+            TimelineEntry.objects.filter(user_id__in=batch).delete()
+            _refill(batch)
+        processed += Follow.objects.filter(user_id__in=batch).count()
+    return processed
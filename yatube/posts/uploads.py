@@ -0,0 +1,171 @@
+import logging
+import os
+import time
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import (
+    StopUpload, TemporaryFileUploadHandler,
+)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+class RejectedUpload:
+    """Место отклонённого файла в request.FILES."""
+
+    def __init__(self, name, rejected):
+        self.name = name
+        self.rejected = rejected
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загрузку на диск кусками и обрывает разбор тела, как только
+    файл превысил POST_IMAGE_MAX_BYTES: остаток запроса пропускается без
+    разбора. Вместо файла в rejected остаётся RejectedUpload, и форма
+    отклоняет его, не открывая.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rejected = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            limit = filesizeformat(settings.POST_IMAGE_MAX_BYTES)
+            self.rejected = RejectedUpload(
+                self.file_name, f'Файл больше {limit}.')
+            raise StopUpload(connection_reset=False)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def bounded_image_uploads(view):
+    """
+    Подключает BoundedImageUploadHandler к view. Обработчики загрузки
+    можно менять только до чтения request.POST, а его читает
+    CsrfViewMiddleware, поэтому CSRF проверяется уже внутри.
+    """
+    protected_view = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        handler = BoundedImageUploadHandler(request)
+        request.upload_handlers = [handler]
+        if request.method == 'POST':
+            # Тело разбирается здесь, чтобы отклонённый файл занял своё
+            # место в FILES: после StopUpload парсер его не вернёт.
+            files = request.FILES
+            if handler.rejected:
+                files[handler.field_name] = handler.rejected
+        return protected_view(request, *args, **kwargs)
+    return wrapper
+
+
+def _flatten(image):
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _memory_kb(field):
+    """Поле VmRSS или VmHWM процесса в КБ; None вне Linux."""
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _start_peak():
+    """
+    Сбрасывает пик RSS процесса к текущему RSS и возвращает его.
+    ru_maxrss хранит пик за всю жизнь процесса и после первой большой
+    загрузки больше не меняется. Параллельные загрузки в потоках
+    того же процесса попадают в один пик.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        return None
+    return _memory_kb('VmRSS')
+
+
+def _peak_growth(start):
+    peak = _memory_kb('VmHWM')
+    if start is None or peak is None:
+        return '-'
+    return peak - start
+
+
+def _shrink(uploaded, max_side):
+    """Размер по заголовку и уменьшенная картинка без поворота по EXIF."""
+    uploaded.seek(0)
+    image = Image.open(uploaded)
+    source_size = image.size
+    width, height = source_size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Картинка {width}x{height} слишком большая.', code='too_large')
+    image.draft('RGB', (max_side, max_side))
+    image.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=2.0)
+    # EXIF не переносится в результат, из него берётся только поворот.
+    return source_size, _flatten(ImageOps.exif_transpose(image))
+
+
+def process_image(uploaded):
+    """
+    Проверяет размеры по заголовку и перекодирует картинку без EXIF с
+    длинной стороной не больше POST_IMAGE_MAX_SIDE.
+
+    Для JPEG draft() уменьшает картинку ещё при декодировании, а
+    reducing_gap - при масштабировании, так что полный растр
+    большой фотографии в памяти не собирается.
+    """
+    started = time.perf_counter()
+    memory = _start_peak()
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    image_format = settings.POST_IMAGE_FORMAT
+    buffer = BytesIO()
+    try:
+        source_size, image = _shrink(uploaded, max_side)
+        image.save(buffer, image_format,
+                   quality=settings.POST_IMAGE_QUALITY, optimize=True)
+    except (OSError, Image.DecompressionBombError) as error:
+        # verify() в ImageField почти не проверяет JPEG: обрезанный файл
+        # обнаруживается только при декодировании.
+        raise ValidationError(
+            'Файл повреждён или обрезан.', code='invalid_image') from error
+    stem = os.path.splitext(os.path.basename(uploaded.name))[0]
+    name = f'{stem}.{FORMAT_EXTENSIONS[image_format]}'
+    logger.info(
+        'Загрузка %s: %sx%s -> %sx%s, %s -> %s байт, %.1f мс, '
+        'растр %s КБ, прирост пика RSS %s КБ',
+        uploaded.name, *source_size, *image.size, uploaded.size,
+        buffer.tell(), (time.perf_counter() - started) * 1000,
+        image.width * image.height * len(image.getbands()) // 1024,
+        _peak_growth(memory),
+    )
+    return InMemoryUploadedFile(
+        buffer, 'image', name, Image.MIME[image_format], buffer.tell(), None)
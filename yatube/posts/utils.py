@@ -1,7 +1,154 @@
-from django.core.paginator import Paginator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
-def paginate(request, posts):
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+from .models import Comment
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, date, pk):
+    """Упаковывает позицию в ленте в непрозрачную строку для URL."""
+    raw = f'{direction}|{date.isoformat()}|{pk}'
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает (direction, date, pk) или None для битого курсора."""
+    try:
+        direction, date, pk = (
+            urlsafe_b64decode(cursor.encode()).decode().split('|'))
+        date = parse_datetime(date)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if direction not in (NEXT, PREVIOUS) or date is None:
+        return None
+    return direction, date, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинатор по паре (date_field, id), от новых записей к
+    старым или, с oldest_first, наоборот.
+
+    Страница выбирается условием по ключу последней показанной записи,
+    поэтому нет ни COUNT(*), ни OFFSET, а новые записи, появившиеся во
+    время прокрутки, не сдвигают уже открытые страницы. Общее число
+    страниц неизвестно: number и num_pages описывают только соседей
+    текущей страницы.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 oldest_first=False):
+        self.date_field = date_field
+        self.oldest_first = oldest_first
+        order = '' if oldest_first else '-'
+        super().__init__(
+            object_list.order_by(f'{order}{date_field}', f'{order}pk'),
+            per_page)
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        return self._number + self._has_next
+
+    def get_page(self, number=None, cursor=None):
+        """
+        Страница по курсору; номер страницы поддерживается для старых
+        ссылок вида ?page=N и тоже обходится без подсчёта строк.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None:
+            return self._keyset_page(*position)
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        return self._offset_page(number)
+
+    def _key(self, obj):
+        # Строки values() приходят словарями.
+        if isinstance(obj, dict):
+            return obj[self.date_field], obj['id']
+        return getattr(obj, self.date_field), obj.pk
+
+    def after(self, queryset, direction, date, pk, pk_field='pk'):
+        """
+        Записи queryset за позицией (date, pk) в сторону direction;
+        назад по ленте - в обратном порядке, ближайшие первыми.
+        """
+        # Дальше по ленте - меньшие ключи, а при oldest_first - большие.
+        after, before = ('gt', 'lt') if self.oldest_first else ('lt', 'gt')
+        lookup = after if direction == NEXT else before
+        queryset = queryset.filter(
+            Q(**{f'{self.date_field}__{lookup}': date})
+            | Q(**{self.date_field: date, f'{pk_field}__{lookup}': pk}))
+        return queryset if direction == NEXT else queryset.reverse()
+
+    def rows(self, direction, position, limit, offset=0):
+        """Строки страницы: limit штук после offset от позиции."""
+        queryset = self.object_list
+        if position is not None:
+            queryset = self.after(queryset, direction, *position)
+        return list(queryset[offset:offset + limit])
+
+    def _keyset_page(self, direction, date, pk):
+        rows = self.rows(direction, (date, pk), self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == NEXT:
+            return self._build_page(rows, has_previous=True,
+                                    has_next=has_more)
+        rows.reverse()
+        return self._build_page(rows, has_previous=has_more, has_next=True)
+
+    def _offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = self.rows(NEXT, None, self.per_page + 1, bottom)
+        if not rows and number > 1:
+            return self._offset_page(1)
+        self._number = number
+        return self._build_page(
+            rows[:self.per_page],
+            has_previous=number > 1,
+            has_next=len(rows) > self.per_page,
+        )
+
+    def _build_page(self, rows, has_previous, has_next):
+        if not rows:
+            has_previous = has_next = False
+        if self._number == 1 and has_previous:
+            self._number = 2
+        self._has_next = has_next
+        page = Page(rows, self._number, self)
+        page.next_cursor = (
+            encode_cursor(NEXT, *self._key(rows[-1])) if has_next else None)
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, *self._key(rows[0]))
+            if has_previous else None)
+        page.cursor = page.previous_cursor or ''
+        return page
+
+
+def paginate(request, posts, paginator_class=CursorPaginator):
+    paginator = paginator_class(posts, POSTS_PER_PAGE)
+    return paginator.get_page(
+        request.GET.get('page'), cursor=request.GET.get('cursor'))
+
+
+def paginate_comments(request, post_id):
+    """Страница комментариев поста, от старых к новым, как до курсоров."""
+    comments = Comment.objects.filter(
+        post_id=post_id).select_related('author')
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, 'created', oldest_first=True)
+    return paginator.get_page(cursor=request.GET.get('cursor'))
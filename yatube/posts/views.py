@@ -1,24 +1,44 @@
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from core.db_router import catch_up, pin_to_primary, read_from_replica
 
+from . import author_cards, freshness
+from .counters import get_stats
 from .forms import PostForm, CommentForm
+from .freshness import conditional_page
 from .models import Follow, Group, Post, User
-from .utils import paginate
+from .page_cache import cached_page
+from .search import search_posts
+from .thumbnails import schedule as schedule_thumbnails
+from .timeline import timeline_paginator
+from .uploads import bounded_image_uploads
+from .utils import POSTS_PER_PAGE, paginate, paginate_comments
 
 
+@read_from_replica
+@conditional_page(freshness.index_scopes, max_age=30)
+@cached_page
 def index(request):
-    posts = Post.objects.select_related('author', 'group')
+    posts = Post.objects.select_related('group')
     page_obj = paginate(request, posts)
+    author_cards.attach(page_obj)
     return render(request, 'posts/index.html', {
         'page_obj': page_obj,
     })
 
 
+@read_from_replica
+@conditional_page(freshness.group_scopes, max_age=60)
+@cached_page
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = paginate(request, posts)
+    page_obj = paginate(request, group.posts.all())
+    author_cards.attach(page_obj)
 
     return render(request, 'posts/group_list.html', {
         'group': group,
@@ -26,31 +46,60 @@ def group_posts(request, slug):
     })
 
 
+@read_from_replica
+@conditional_page(freshness.author_scopes, max_age=60)
+@cached_page
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     author_posts = author.posts.select_related('group')
     page_obj = paginate(request, author_posts)
+    author_cards.attach(page_obj)
     following = (request.user.is_authenticated
                  and author.following.filter(user=request.user).exists())
     return render(request, 'posts/profile.html', {
         'author': author,
+        'stats': get_stats(author),
         'page_obj': page_obj,
         'following': following,
 
     })
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginator(search_posts(query), POSTS_PER_PAGE).get_page(
+        request.GET.get('page'))
+    posts = Post.objects.select_related('group').in_bulk(
+        page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts]
+    author_cards.attach(page_obj)
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'page_params': urlencode({'q': query}) + '&' if query else '',
+    })
+
+
+def post_detail_queryset():
+    """Пост вместе с автором, его счётчиками и группой одним запросом."""
+    return Post.objects.select_related('author__stats', 'group')
+
+
+@read_from_replica
+@conditional_page(freshness.post_detail_scopes, max_age=60)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = post.author.posts.select_related().count()
+    post = get_object_or_404(post_detail_queryset(), pk=post_id)
+    posts_count = get_stats(post.author).posts_count
     comment_form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = paginate_comments(request, post.pk)
     if comment_form.is_valid():
         comment = comment_form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -61,7 +110,39 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@read_from_replica
+def post_comments(request, post_id):
+    """
+    Следующая страница комментариев для подгрузки со страницы поста:
+    HTML-фрагмент или JSON при ?format=json.
+    """
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = paginate_comments(request, post_id)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    return render(request, 'includes/comments.html', {
+        'comments': comments,
+        'post_id': post_id,
+        'fragment': True,
+    })
+
+
 @login_required
+@pin_to_primary
+@bounded_image_uploads
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -69,11 +150,16 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            schedule_thumbnails(post)
         return redirect('posts:profile', post.author.username)
     return render(request, template, {'form': form})
 
 
 @login_required
+@pin_to_primary
+@bounded_image_uploads
+@transaction.atomic
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
     post = get_object_or_404(Post, pk=post_id)
@@ -85,7 +171,12 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         post = form.save(commit=False)
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            post.thumbnails_ready = False
         post.save()
+        if image_changed and post.image:
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'is_edit': is_edit,
@@ -96,6 +187,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@pin_to_primary
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -108,10 +201,16 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
-    posts = Post.objects.select_related(
-        'author', 'group').filter(author__following__user=request.user)
-    page_obj = paginate(request, posts)
+    posts = Post.objects.select_related('group')
+    paginator_class = timeline_paginator(request.user)
+    page_obj = paginate(request, posts, paginator_class)
+    if catch_up(freshness.last_modified(freshness.card_scopes(page_obj))):
+        # Карточки страницы кэшируются по версии последней записи, а
+        # реплика могла её ещё не получить.
+        page_obj = paginate(request, posts, paginator_class)
+    author_cards.attach(page_obj)
     context = {
         'page_obj': page_obj,
     }
@@ -119,6 +218,8 @@ def follow_index(request):
 
 
 @login_required
+@pin_to_primary
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -127,6 +228,8 @@ def profile_follow(request, username):
 
 
 @login_required
+@pin_to_primary
+@transaction.atomic
 def profile_unfollow(request, username):
     Follow.objects.filter(
         author__username=username, user=request.user).delete()
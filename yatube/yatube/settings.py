@@ -1,5 +1,7 @@
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -7,18 +9,34 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
+# Профиль окружения: dev - локальная разработка, test - прогон тестов,
+# prod - боевой сервер. Всё, чем они отличаются, переключается
+# переменными окружения YATUBE_*, правка кода не нужна.
+YATUBE_ENV = os.getenv('YATUBE_ENV', 'dev')
+if YATUBE_ENV not in ('dev', 'test', 'prod'):
+    raise ImproperlyConfigured(
+        f'YATUBE_ENV должен быть dev, test или prod, а не {YATUBE_ENV}')
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'g#passmt%ulp07e+u2qx88+fd_roxh_c89z_)*p0^&4zt52exx'
+SECRET_KEY = os.getenv('YATUBE_SECRET_KEY')
+if not SECRET_KEY:
+    if YATUBE_ENV == 'prod':
+        raise ImproperlyConfigured('В prod задайте YATUBE_SECRET_KEY.')
+    # Ключ из репозитория годится только для разработки и тестов.
+    SECRET_KEY = 'g#passmt%ulp07e+u2qx88+fd_roxh_c89z_)*p0^&4zt52exx'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# При DEBUG каждый SQL-запрос копится в connection.queries.
+DEBUG = os.getenv(
+    'YATUBE_DEBUG', '1' if YATUBE_ENV == 'dev' else '') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
     '[::1]',
     'testserver',
-]
+] + [host for host in os.getenv('YATUBE_ALLOWED_HOSTS', '').split(',')
+     if host]
 
 
 # Application definition
@@ -39,6 +57,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'posts.page_cache.PageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -47,6 +66,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# YATUBE_PROFILING=1 включает замеры каждого запроса, сводка по ним - на
+# /admin/profiling/. SAMPLE_RATE - доля запросов, которые целиком
+# снимаются cProfile в DUMP_DIR.
+PROFILING = {
+    'SAMPLE_RATE': float(os.getenv('YATUBE_PROFILING_SAMPLE', 0)),
+    'DUMP_DIR': os.path.join(BASE_DIR, 'profiles'),
+}
+if os.getenv('YATUBE_PROFILING'):
+    MIDDLEWARE.insert(0, 'core.profiling.ProfilingMiddleware')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
@@ -66,17 +95,85 @@ TEMPLATES = [
     },
 ]
 
+# Вне отладки шаблоны читаются с диска и разбираются один раз на процесс;
+# YATUBE_TEMPLATE_CACHE=1 включает кэширующий загрузчик и при DEBUG.
+# YATUBE_TEMPLATE_WARMUP=1 компилирует все шаблоны при старте.
+TEMPLATE_CACHE = os.getenv(
+    'YATUBE_TEMPLATE_CACHE', '' if DEBUG else '1') == '1'
+TEMPLATE_WARMUP = os.getenv('YATUBE_TEMPLATE_WARMUP') == '1'
+if TEMPLATE_CACHE:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# База выбирается переменной YATUBE_DB, параметры подключения -
+# YATUBE_DB_NAME, YATUBE_DB_USER и т.д. Соединения живут между запросами
+# YATUBE_DB_CONN_MAX_AGE секунд; пул для PostgreSQL - pgbouncer, на
+# который указывает YATUBE_DB_HOST.
+DATABASE_ENGINES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': 'yatube',
+        'USER': os.getenv('YATUBE_DB_USER', 'yatube'),
+        'PASSWORD': os.getenv('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.getenv('YATUBE_DB_HOST', '127.0.0.1'),
+        'PORT': os.getenv('YATUBE_DB_PORT', '5432'),
+        'OPTIONS': {'connect_timeout': 5},
+    },
+}
+DATABASES = {
+    'default': dict(DATABASE_ENGINES[os.getenv('YATUBE_DB', 'sqlite')]),
+}
+if os.getenv('YATUBE_DB_NAME'):
+    DATABASES['default']['NAME'] = os.getenv('YATUBE_DB_NAME')
+DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv(
+    'YATUBE_DB_CONN_MAX_AGE', 600 if YATUBE_ENV == 'prod' else 0))
+
+# Реплики для чтения: YATUBE_DB_REPLICAS - через запятую файлы SQLite или
+# хосты PostgreSQL. GET-страницы лент читают посты с реплик по кругу;
+# записавший что-то пользователь REPLICA_PIN_SECONDS секунд читает с
+# основной базы. Столько же после любой записи с основной базы читаются
+# страницы, чьи отметки свежести она сдвинула, - иначе отставшие данные
+# попали бы в кэши под новой отметкой. Недоступная реплика пропускается
+# REPLICA_RETRY_SECONDS.
+REPLICA_DATABASES = []
+for number, location in enumerate(
+        filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica_{number}'
+    location_key = 'NAME' if os.getenv('YATUBE_DB', 'sqlite') == 'sqlite' \
+        else 'HOST'
+    DATABASES[alias] = dict(DATABASES['default'], **{
+        location_key: location,
+        'TEST': {'MIRROR': 'default'},
+    })
+    REPLICA_DATABASES.append(alias)
+REPLICA_APPS = ['posts']
+REPLICA_PIN_SECONDS = 5
+REPLICA_RETRY_SECONDS = 30
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Применяются к каждому новому соединению с SQLite: WAL не блокирует
+# чтение на время записи, NORMAL в WAL не теряет целостность при сбое
+# процесса, busy_timeout ждёт блокировку вместо ошибки.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 2 ** 20,
 }
 
 
@@ -98,6 +195,10 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# В тестах пароли хэшируются быстро: надёжность там не нужна.
+if YATUBE_ENV == 'test':
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -130,13 +231,83 @@ AMOUNT_TEST = 13
 AMOUNT_EXPECTED = 10
 CONST_STR = 15
 
+# Авторы с большим числом подписчиков не рассылают посты по лентам,
+# их посты подмешиваются в ленту подписки при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+# auto - FTS5 на SQLite, где он собран, иначе таблица SearchTerm.
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 1000
+SEARCH_MAX_ROWS = 5000
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Размеры миниатюр картинок постов. В профиле prod миниатюры создаются в
+# фоновом пуле потоков, в остальных - сразу после сохранения поста.
+POST_THUMBNAILS = {
+    'card': (960, 339),
+    'detail': (1280, 452),
+    'retina': (1920, 678),
+}
+THUMBNAIL_WORKERS = 2 if YATUBE_ENV == 'prod' else 0
+
+# Ограничения загружаемых картинок: байты проверяются во время загрузки,
+# пиксели - по заголовку до декодирования.
+POST_IMAGE_MAX_BYTES = 15 * 2 ** 20
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_FORMAT = 'JPEG'
+POST_IMAGE_QUALITY = 85
+
+# Общий кэш выбирается переменной окружения YATUBE_CACHE, адрес сервера -
+# YATUBE_CACHE_LOCATION. YATUBE_CACHE_L1 > 0 включает поверх общего кэша
+# LRU в памяти процесса на указанное число записей.
+CACHE_TIERS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    },
+    'redis': {
+        'BACKEND': 'core.cache_backends.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/0',
+    },
 }
+SHARED_CACHE = dict(CACHE_TIERS[os.getenv('YATUBE_CACHE', 'locmem')])
+if os.getenv('YATUBE_CACHE_LOCATION'):
+    SHARED_CACHE['LOCATION'] = os.getenv('YATUBE_CACHE_LOCATION')
+L1_CACHE_ENTRIES = int(os.getenv('YATUBE_CACHE_L1', 0))
+
+if L1_CACHE_ENTRIES:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.TieredCache',
+            'OPTIONS': {
+                'L2': 'shared',
+                'MAX_ENTRIES': L1_CACHE_ENTRIES,
+                'L1_TIMEOUT': 5,
+            },
+        },
+        'shared': SHARED_CACHE,
+    }
+else:
+    CACHES = {'default': SHARED_CACHE}
+
+# Кэш целых страниц лент для гостей, секунды; 0 выключает его. Копия
+# устаревает сама, как только меняются посты её области.
+PAGE_CACHE_SECONDS = int(os.getenv(
+    'YATUBE_PAGE_CACHE', 60 if YATUBE_ENV == 'prod' else 0))
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -18,11 +18,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import profiling_stats
+
 urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls', namespace='posts')),
+    path('admin/profiling/', profiling_stats, name='profiling'),
     path('admin/', admin.site.urls),
     path('auth/', include('django.contrib.auth.urls'))
 ]